@@ -7,71 +7,108 @@
 # ============================================
 
 from __future__ import annotations
-import os, glob, json
+import os, glob, math
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime
+from datetime import date, datetime
 
 import numpy as np
+import orjson
 import pandas as pd
 import joblib
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # ---------- Deep sanitizer ----------
-def _sanitize_json(obj):
-    """Recursively sanitize any object into JSON-safe types:
-       - numpy scalars -> python
-       - pandas Timestamps -> isoformat string
-       - float NaN/±Inf -> None
-       - sets/tuples -> lists
-       - dict/list -> deep-sanitized
-    """
-    # numpy scalars
-    if isinstance(obj, (np.integer, np.bool_)):
-        return obj.item()
-    if isinstance(obj, np.floating):
-        x = float(obj)
-        if not np.isfinite(x):
-            return None
-        return x
-
-    # plain floats
-    if isinstance(obj, float):
-        if not np.isfinite(obj):
-            return None
-        return obj
-
-    # pandas timey / datetime
+def _sanitize_leaf(obj):
+    """Sanitasi nilai tunggal: Timestamp/Timedelta -> isoformat, NA-like
+    (NaT/pd.NA) -> None. NaN/±Inf dan numpy scalars ditangani orjson."""
     if isinstance(obj, (pd.Timestamp, pd.Timedelta, datetime)):
         try:
             return obj.isoformat()
         except Exception:
             return str(obj)
-
-    # pandas NA-like
     try:
         if pd.isna(obj):
             return None
     except Exception:
         pass
+    return obj
 
-    # containers
+def _sanitize_json(obj):
+    """Thin pre-pass sebelum orjson: jalan iteratif dengan stack eksplisit
+    (tanpa rekursi — aman untuk payload bersarang besar):
+       - dict/list/tuple/set -> container baru yang sudah bersih
+       - leaf lewat _sanitize_leaf
+    """
     if isinstance(obj, dict):
-        return {str(k): _sanitize_json(v) for k, v in obj.items()}
-    if isinstance(obj, (list, tuple, set)):
-        return [_sanitize_json(v) for v in obj]
-
-    return obj
+        root: Any = {}
+    elif isinstance(obj, (list, tuple, set)):
+        root = []
+    else:
+        return _sanitize_leaf(obj)
+
+    stack = [(obj, root)]
+    while stack:
+        src, dst = stack.pop()
+        if isinstance(src, dict):
+            for k, v in src.items():
+                k = str(k)
+                if isinstance(v, dict):
+                    child: Any = {}
+                    dst[k] = child
+                    stack.append((v, child))
+                elif isinstance(v, (list, tuple, set)):
+                    child = []
+                    dst[k] = child
+                    stack.append((v, child))
+                else:
+                    dst[k] = _sanitize_leaf(v)
+        else:
+            for v in src:
+                if isinstance(v, dict):
+                    child = {}
+                    dst.append(child)
+                    stack.append((v, child))
+                elif isinstance(v, (list, tuple, set)):
+                    child = []
+                    dst.append(child)
+                    stack.append((v, child))
+                else:
+                    dst.append(_sanitize_leaf(v))
+    return root
+
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _orjson_default(obj):
+    """Default hook orjson: hanya dipanggil untuk tipe yang tidak dikenal
+    encoder (Timestamp/Timedelta/NA/set) — payload yang sudah bersih tidak
+    membayar walk Python sama sekali."""
+    if isinstance(obj, (pd.Timestamp, pd.Timedelta, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    try:
+        if pd.isna(obj):
+            return None
+    except (TypeError, ValueError):
+        pass
+    raise TypeError  # biar jatuh ke jalur _sanitize_json
 
 class SafeJSONResponse(JSONResponse):
     def render(self, content) -> bytes:
-        clean = _sanitize_json(content)
-        # allow_nan=False memastikan tidak ada token NaN/Infinity muncul
-        return json.dumps(clean, ensure_ascii=False, allow_nan=False).encode("utf-8")
+        # orjson: NaN/Infinity otomatis jadi null, numpy scalars diserialisasi natif
+        try:
+            return orjson.dumps(content, default=_orjson_default, option=_ORJSON_OPTS)
+        except TypeError:
+            # payload eksotis (key aneh, container tak dikenal): pre-pass penuh
+            return orjson.dumps(_sanitize_json(content), option=_ORJSON_OPTS)
 
 # ---------- Config ----------
 load_dotenv()
@@ -100,43 +137,163 @@ app.add_middleware(
 
 # ---------- Helpers ----------
 def safe_rows(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Konversi DataFrame -> list of dict JSON-safe dalam satu pass kolom
+    (tanpa re-walk per sel): NaN/±Inf -> None, datetime -> isoformat string."""
     if df is None or df.empty:
         return []
-    df = df.replace([np.inf, -np.inf], np.nan)
-    df = df.where(pd.notnull(df), None)
+    # shallow copy cukup: assignment di bawah mengganti kolom utuh (blok
+    # baru), tidak pernah menulis in-place ke frame milik caller/cache
+    df = df.copy(deep=False)
+    for c in df.select_dtypes(include=[np.number]).columns:
+        arr = df[c].to_numpy()
+        mask = ~np.isfinite(arr)
+        if mask.any():
+            df[c] = np.where(mask, None, arr.astype(object))
+    for c in df.select_dtypes(include=["datetime", "datetimetz"]).columns:
+        df[c] = df[c].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    obj_cols = df.select_dtypes(include=["object"]).columns
+    if len(obj_cols):
+        df[obj_cols] = df[obj_cols].where(pd.notnull(df[obj_cols]), None)
     return df.to_dict(orient="records")
 
-def load_latest_file(pattern: str) -> Optional[str]:
-    files = sorted(glob.glob(os.path.join(DATA_DIR, pattern)))
-    return files[-1] if files else None
-
-def find_agg_on_or_before(date_str: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
-    files = sorted(glob.glob(os.path.join(DATA_DIR, "broker_agg_*.csv")))
+def _parquet_sibling(path: str) -> Optional[str]:
+    """Parquet hasil migrasi (pipelines/migrate_to_parquet.py) di samping CSV.
+    Dipakai hanya jika ada dan tidak lebih tua dari CSV-nya."""
+    pq = os.path.splitext(path)[0] + ".parquet"
+    try:
+        if os.stat(pq).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return pq
+    except OSError:
+        pass
+    return None
+
+def _normalize_symbol_col(df: pd.DataFrame) -> pd.DataFrame:
+    """Uppercase kolom symbol SEKALI saat parse; downstream tinggal pakai."""
+    if "symbol" in df.columns:
+        df["symbol"] = df["symbol"].astype(str).str.upper()
+    return df
+
+@lru_cache(maxsize=128)
+def _read_table_cached(path: str, mtime_ns: int) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return _normalize_symbol_col(pd.read_parquet(path, engine="pyarrow"))
+    # engine="pyarrow": parse multi-thread, string kolumnar (bukan objek per sel)
+    df = pd.read_csv(path, engine="pyarrow")
+    # pyarrow auto-parse kolom tanggal ISO (date32/datetime); kembalikan ke
+    # string YYYY-MM-DD (format kanonik pipeline) supaya payload JSON tetap
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            df[c] = s.dt.strftime("%Y-%m-%d")
+        elif s.dtype == object:
+            nn = s.dropna()
+            if len(nn) and isinstance(nn.iloc[0], date):
+                df[c] = pd.to_datetime(s, errors="coerce").dt.strftime("%Y-%m-%d")
+    return _normalize_symbol_col(df)
+
+def read_table_cached(path: str) -> pd.DataFrame:
+    """Baca CSV/Parquet dengan cache per (path, mtime): file yang sama
+    tidak diparse ulang tiap request, dan Parquet sibling dipilih lebih
+    dulu (parse kolumnar jauh lebih cepat dari CSV). Return shallow copy
+    supaya caller aman menulis kolom tanpa mengotori cache."""
+    path = _parquet_sibling(path) or path
+    mtime_ns = os.stat(path).st_mtime_ns
+    return _read_table_cached(path, mtime_ns).copy(deep=False)
+
+# Index file per prefix, di-rebuild hanya saat mtime DATA_DIR berubah.
+# Nama file memuat tanggal ISO sehingga sort leksikal == sort tanggal.
+_FILE_INDEX: Dict[str, Tuple[int, List[str], List[str]]] = {}
+
+def _file_index(prefix: str) -> Tuple[List[str], List[str]]:
+    """Return (dates, paths) terurut naik untuk file '{prefix}_YYYY-MM-DD.csv'."""
+    try:
+        dir_mtime = os.stat(DATA_DIR).st_mtime_ns
+    except OSError:
+        return [], []
+    cached = _FILE_INDEX.get(prefix)
+    if cached and cached[0] == dir_mtime:
+        return cached[1], cached[2]
+    files = sorted(glob.glob(os.path.join(DATA_DIR, f"{prefix}_*.csv")))
+    n = len(prefix) + 1
+    dates = [os.path.basename(p)[n:-4] for p in files]
+    _FILE_INDEX[prefix] = (dir_mtime, dates, files)
+    return dates, files
+
+def _find_on_or_before(prefix: str, date_str: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """File terakhir dengan tanggal <= date_str (atau paling akhir bila None),
+    via bisect pada index terurut — O(log N) tanpa scan direktori per call."""
+    dates, files = _file_index(prefix)
     if not files:
         return None, None
     if not date_str:
-        path = files[-1]
-        eff = os.path.basename(path)[11:-4]
-        return path, eff
-    tgt = pd.to_datetime(date_str).date()
-    candidates: List[Tuple[pd.Timestamp, str]] = []
-    for p in files:
-        d = pd.to_datetime(os.path.basename(p)[11:-4]).date()
-        if d <= tgt:
-            candidates.append((pd.Timestamp(d), p))
-    if not candidates:
+        return files[-1], dates[-1]
+    if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-":
+        tgt = date_str  # sudah YYYY-MM-DD (kasus umum) — tak perlu parse pandas
+    else:
+        tgt = pd.to_datetime(date_str).strftime("%Y-%m-%d")
+    i = bisect_right(dates, tgt)
+    if i == 0:
         return None, None
-    candidates.sort()
-    path = candidates[-1][1]
-    eff  = os.path.basename(path)[11:-4]
-    return path, eff
+    return files[i - 1], dates[i - 1]
+
+def load_latest_file(pattern: str) -> Optional[str]:
+    prefix = pattern.split("_*")[0]
+    _, files = _file_index(prefix)
+    return files[-1] if files else None
+
+def find_agg_on_or_before(date_str: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    return _find_on_or_before("broker_agg", date_str)
 
 def load_artifact():
     if not os.path.exists(MODEL_PATH):
         return None
-    return joblib.load(MODEL_PATH)
+    # mmap_mode='r': array besar di artifact tetap memory-mapped (lazy-paged,
+    # shared antar proses worker). Model harus di filesystem lokal.
+    return joblib.load(MODEL_PATH, mmap_mode="r")
 
 ART = load_artifact()  # {"model","features","target","threshold_default",...}
+FEATURES: Tuple[str, ...] = tuple(ART["features"]) if ART else ()
+
+# Kolom snapshot yang benar-benar dipakai jalur predict/signals/explain.
+# CSV parse itu O(bytes) — proyeksi kolom memangkas parse di file lebar.
+SNAP_COLS = frozenset(["symbol", "date", "close", "volume", "ret_1", "vol_ratio", *FEATURES])
+
+def _snap_col_filter(c: str) -> bool:
+    return c in SNAP_COLS or c.startswith("top_buyer") or c.startswith("total_net")
+
+@lru_cache(maxsize=128)
+def _read_snapshot_slim(path: str, mtime_ns: int) -> pd.DataFrame:
+    return _normalize_symbol_col(pd.read_csv(path, usecols=_snap_col_filter, engine="c"))
+
+def read_snapshot_slim(path: str) -> pd.DataFrame:
+    """Snapshot dengan kolom terproyeksi (usecols) untuk jalur hot.
+    Sibling Parquet tetap lewat cache penuh lalu dipotong kolumnar."""
+    pq = _parquet_sibling(path)
+    if pq:
+        df = read_table_cached(path)
+        keep = [c for c in df.columns if _snap_col_filter(c)]
+        return df[keep]
+    mtime_ns = os.stat(path).st_mtime_ns
+    return _read_snapshot_slim(path, mtime_ns).copy(deep=False)
+
+@lru_cache(maxsize=1)
+def _latest_close_map_cached(path: str, mtime_ns: int) -> Dict[str, float]:
+    df = read_snapshot_slim(path)
+    if df.empty or "symbol" not in df.columns:
+        return {}
+    sym = df["symbol"]
+    close = pd.to_numeric(df.get("close"), errors="coerce")
+    ok = close.notna()
+    return dict(zip(sym[ok].to_numpy(), close[ok].to_numpy(dtype=float)))
+
+def latest_close_map() -> Dict[str, float]:
+    """Map symbol -> close dari snapshot paling akhir; dihitung ulang hanya
+    saat file terbarunya berganti."""
+    path = load_latest_file("daily_snapshot_*.csv")
+    if not path:
+        return {}
+    real = _parquet_sibling(path) or path
+    return _latest_close_map_cached(path, os.stat(real).st_mtime_ns)
 
 # === NEW: cari snapshot tepat tanggal atau terakhir ≤ tanggal ===
 def find_snapshot_on_or_before(date_str: Optional[str]) -> tuple[Optional[str], Optional[str]]:
@@ -145,25 +302,7 @@ def find_snapshot_on_or_before(date_str: Optional[str]) -> tuple[Optional[str],
     Kalau tidak ada, pilih snapshot terakhir yang <= date_str.
     Return: (path, effective_date) atau (None, None) bila tidak ada.
     """
-    files = sorted(glob.glob(os.path.join(DATA_DIR, "daily_snapshot_*.csv")))
-    if not files:
-        return None, None
-    if not date_str:
-        path = files[-1]
-        eff = os.path.basename(path)[15:-4]
-        return path, eff
-    tgt = pd.to_datetime(date_str).date()
-    cand: list[tuple[pd.Timestamp, str]] = []
-    for p in files:
-        d = pd.to_datetime(os.path.basename(p)[15:-4]).date()
-        if d <= tgt:
-            cand.append((pd.Timestamp(d), p))
-    if not cand:
-        return None, None
-    cand.sort()
-    path = cand[-1][1]
-    eff  = os.path.basename(path)[15:-4]
-    return path, eff
+    return _find_on_or_before("daily_snapshot", date_str)
 
 # ---------- Schemas ----------
 class PredictIn(BaseModel):
@@ -187,59 +326,188 @@ class PredictBatchIn(BaseModel):
     threshold: Optional[float] = None
 
 # ---------- Predict Utils ----------
+# ==== Numba (opsional): sigmoid fallback satu pass tanpa temporari ====
+try:
+    from numba import njit, prange
+
+    @njit(fastmath=True, parallel=True, cache=True)
+    def _sigmoid_jit(s):  # pragma: no cover - dikompilasi numba
+        out = np.empty_like(s)
+        for i in prange(s.size):
+            out[i] = 1.0 / (1.0 + math.exp(-s[i]))
+        return out
+
+    # warm-up saat import: biaya kompilasi JIT dibayar di startup,
+    # bukan di request pertama yang kena jalur fallback
+    _sigmoid_jit(np.zeros(1, dtype=np.float64))
+except Exception:
+    _sigmoid_jit = None
+
 def _clf_proba(clf, X: np.ndarray) -> np.ndarray:
     if hasattr(clf, "predict_proba"):
         return clf.predict_proba(X)[:, 1].astype(float)
     s = clf.decision_function(X).astype(float)
+    if _sigmoid_jit is not None:
+        return _sigmoid_jit(np.ascontiguousarray(s))
     return 1.0 / (1.0 + np.exp(-s))
 
-def build_feature_row_from_snapshot_row(snap_row: Dict[str, Any]) -> Dict[str, float]:
-    if ART is None:
-        return {}
-    out: Dict[str, float] = {}
-    for f in ART["features"]:
-        v = snap_row.get(f, 0.0)
-        try:
-            v = 0.0 if pd.isna(v) else float(v)
-        except Exception:
-            v = 0.0
-        out[f] = float(v)
-    return out
+# Warm predict sekali di import: page-in array mmap + trigger jalur
+# Cython/validasi estimator, supaya request pertama tidak membayarnya.
+if ART is not None and FEATURES:
+    try:
+        _clf_proba(ART["model"], np.zeros((1, len(FEATURES)), dtype=np.float32))
+    except Exception:
+        pass
 
-def predict_batch_from_snapshot(
+def _to_float(v) -> float:
+    """Koersi longgar tanpa dispatch pandas: NaN/None/non-numeric -> 0.0."""
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(x) else x
+
+def build_feature_vector_from_snapshot_row(snap_row: "Dict[str, Any] | pd.Series") -> np.ndarray:
+    """Vektor fitur (1, n_features) float32 langsung dari satu baris snapshot
+    (dict atau Series — cukup yang punya .get, tanpa materialisasi dict)."""
+    return np.fromiter(
+        (_to_float(snap_row.get(f, 0.0)) for f in FEATURES),
+        dtype=np.float32,
+        count=len(FEATURES),
+    ).reshape(1, -1)
+
+def score_batch_from_snapshot(
     snap_df: pd.DataFrame,
-    threshold: float,
     symbols: Optional[List[str]] = None,
 ) -> pd.DataFrame:
+    """Skor prob_up per baris snapshot (tanpa threshold/label)."""
     if ART is None:
         raise RuntimeError("Model belum dimuat.")
     if snap_df is None or snap_df.empty:
-        return pd.DataFrame(columns=["symbol", "asof", "prob_up", "label"])
+        return pd.DataFrame(columns=["symbol", "asof", "prob_up"])
 
-    df = snap_df.copy()
-    df["symbol"] = df["symbol"].astype(str).str.upper()
+    df = _prepare_snapshot_frame(snap_df, symbols)
+    proba = _clf_proba(ART["model"], _feature_matrix(df))
+    return pd.DataFrame({
+        "symbol": df["symbol"].values,
+        "asof": df["date"].astype(str).values,
+        "prob_up": proba,
+    })
 
-    # --- filter bar tidak valid (close<=0 / NaN) ---
-    df["close"] = pd.to_numeric(df["close"], errors="coerce")
-    df = df[df["close"].notna() & (df["close"] > 0)]
+def _prepare_snapshot_frame(snap_df: pd.DataFrame, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+    """Normalisasi + filter baris snapshot sebelum scoring.
+    Tanpa snap_df.copy(): mask dihitung dulu, baru slice sekali (filter bar
+    tidak valid: close<=0 / NaN). Kolom symbol sudah uppercase dari reader
+    (dinormalisasi sekali saat parse), jadi tidak di-upper ulang di sini."""
+    close_n = pd.to_numeric(snap_df["close"], errors="coerce")
+    mask = close_n.notna() & (close_n > 0)
+    df = snap_df.loc[mask].assign(close=close_n[mask])
 
     if symbols:
         want = [s.upper() for s in symbols]
         df = df[df["symbol"].isin(want)]
     if len(df) > PREDICT_BATCH_LIMIT:
-        df = df.iloc[:PREDICT_BATCH_LIMIT].copy()
-    for f in ART["features"]:
-        if f not in df.columns:
-            df[f] = 0.0
-    X = df[ART["features"]].astype(float).fillna(0.0).to_numpy()
+        # head() cukup: matriks fitur dialokasikan fresh, tidak ada aliasing
+        df = df.head(PREDICT_BATCH_LIMIT)
+    return df
+
+def _feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    """Isi matriks fitur per kolom ke buffer float32 C-order; kolom yang
+    tidak ada di snapshot dibiarkan 0 tanpa menulis kolom dummy ke df.
+    FEATURES diikat ke lokal: tanpa LOAD_GLOBAL+subscript per akses."""
+    feats = FEATURES
+    get_col = df.get
+    X = np.zeros((len(df), len(feats)), dtype=np.float32, order="C")
+    for i, f in enumerate(feats):
+        col = get_col(f)
+        if col is not None:
+            X[:, i] = col.to_numpy(dtype=np.float32, na_value=0.0, copy=False)
+    return X
+
+def _merge_agg_extras(snap: pd.DataFrame, agg_path: str) -> pd.DataFrame:
+    """Gabungkan kolom broker_agg yang belum ada di snapshot (fitur broker
+    di file snapshot lama bisa kosong; agg tanggal sama melengkapinya)."""
+    agg = read_table_cached(agg_path)
+    if agg.empty or "symbol" not in agg.columns:
+        return snap
+    # merge hanya kolom yang belum ada di snapshot; kolom tabrakan
+    # cuma jadi duplikat _agg yang tak pernah dibaca downstream
+    extra = [c for c in agg.columns if c == "symbol" or c not in snap.columns]
+    if len(extra) > 1:
+        snap = snap.merge(agg[extra], on="symbol", how="left")
+    return snap
+
+def _snap_for_scoring(path: str, agg_path: Optional[str]) -> pd.DataFrame:
+    snap = read_snapshot_slim(path)
+    if agg_path:
+        snap = _merge_agg_extras(snap, agg_path)
+    return snap
+
+# Cache skor per (path, mtime, agg_path, agg_mtime). Dict manual (bukan
+# lru_cache) supaya prewarm_scores bisa mengisi banyak hari sekaligus dari
+# satu batch predict. Identitas agg ikut di kunci karena skor dihitung dari
+# frame gabungan snapshot+agg — agg berubah berarti skor berubah.
+_ScoreKey = Tuple[str, int, Optional[str], int]
+_SCORE_CACHE: Dict[_ScoreKey, pd.DataFrame] = {}
+_SCORE_CACHE_MAX = 512
+
+def _score_cache_key(path: str, agg_path: Optional[str] = None) -> _ScoreKey:
+    real = _parquet_sibling(path) or path
+    agg_mtime = 0
+    if agg_path:
+        real_agg = _parquet_sibling(agg_path) or agg_path
+        agg_mtime = os.stat(real_agg).st_mtime_ns
+    return (path, os.stat(real).st_mtime_ns, agg_path, agg_mtime)
+
+def _score_cache_put(key: _ScoreKey, df: pd.DataFrame) -> None:
+    if len(_SCORE_CACHE) >= _SCORE_CACHE_MAX:
+        _SCORE_CACHE.pop(next(iter(_SCORE_CACHE)))
+    _SCORE_CACHE[key] = df
+
+def score_snapshot_cached(path: str, agg_path: Optional[str] = None) -> pd.DataFrame:
+    """Skor model per file snapshot (plus broker_agg tanggal sama bila
+    diberikan — frame yang diskor sama dengan yang dilihat /signals),
+    dimemo per (path, mtime, agg_path, agg_mtime) — file yang belum
+    berubah tidak perlu predict ulang. Threshold dipakai caller."""
+    key = _score_cache_key(path, agg_path)
+    hit = _SCORE_CACHE.get(key)
+    if hit is None:
+        hit = score_batch_from_snapshot(_snap_for_scoring(path, agg_path))
+        _score_cache_put(key, hit)
+    return hit.copy(deep=False)
+
+def prewarm_scores(pairs: List[Tuple[str, Optional[str]]]) -> None:
+    """Skor semua (snapshot, agg tanggal sama) yang belum ada di cache
+    dengan SATU panggilan predict: overhead per-call sklearn (validasi
+    input, warmup thread) dibayar sekali per range, bukan per hari."""
+    pending: List[Tuple[_ScoreKey, pd.DataFrame]] = []
+    for p, ap in pairs:
+        key = _score_cache_key(p, ap)
+        if key in _SCORE_CACHE:
+            continue
+        df = _prepare_snapshot_frame(_snap_for_scoring(p, ap))
+        pending.append((key, df))
+    if not pending:
+        return
+    X = np.vstack([_feature_matrix(df) for _, df in pending])
     proba = _clf_proba(ART["model"], X)
-    label = (proba >= float(threshold)).astype(int)
-    out = pd.DataFrame({
-        "symbol": df["symbol"].values,
-        "asof": df["date"].astype(str).values,
-        "prob_up": proba,
-        "label": label,
-    })
+    off = 0
+    for key, df in pending:
+        n = len(df)
+        _score_cache_put(key, pd.DataFrame({
+            "symbol": df["symbol"].values,
+            "asof": df["date"].astype(str).values,
+            "prob_up": proba[off:off + n],
+        }))
+        off += n
+
+def predict_batch_from_snapshot(
+    snap_df: pd.DataFrame,
+    threshold: float,
+    symbols: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    out = score_batch_from_snapshot(snap_df, symbols=symbols)
+    out["label"] = (out["prob_up"] >= float(threshold)).astype(int) if not out.empty else []
     return out
 
 # ---------- Routes ----------
@@ -253,24 +521,25 @@ def health():
     if not (0.0 < td <= 1.0):
         td = THRESHOLD_DEFAULT if (0.0 < THRESHOLD_DEFAULT <= 1.0) else 0.35
 
-    return {
+    # return Response langsung: lewati jsonable_encoder FastAPI
+    return SafeJSONResponse({
         "status": "ok",
         "has_model": ART is not None,
-        "model_features": (ART.get("features") if ART else None),
+        "model_features": (list(FEATURES) if ART else None),
         "target": (ART.get("target") if ART else None),
         "threshold_default": td,
         "predict_batch_limit": PREDICT_BATCH_LIMIT,
-    }
+    })
 
 @app.get("/tickers")
 def tickers():
     path = load_latest_file("daily_snapshot_*.csv")
     syms: List[str] = []
     if path:
-        df = pd.read_csv(path)
+        df = read_table_cached(path)
         if "symbol" in df.columns:
-            syms = sorted(df["symbol"].astype(str).str.upper().unique().tolist())
-    return {"tickers": syms}
+            syms = sorted(df["symbol"].unique().tolist())
+    return SafeJSONResponse({"tickers": syms})
 
 @app.get("/snapshot")
 def snapshot(date: Optional[str] = Query(default=None, description="YYYY-MM-DD")):
@@ -281,18 +550,19 @@ def snapshot(date: Optional[str] = Query(default=None, description="YYYY-MM-DD")
     else:
         path = load_latest_file("daily_snapshot_*.csv")
         if not path:
-            return {"date": None, "rows": []}
+            return SafeJSONResponse({"date": None, "rows": []})
         date = os.path.basename(path)[15:-4]
-    df = pd.read_csv(path)
-    return {"date": date, "rows": safe_rows(df)}
+    df = read_table_cached(path)
+    # return Response langsung: lewati jsonable_encoder FastAPI
+    return SafeJSONResponse({"date": date, "rows": safe_rows(df)})
 
 @app.get("/broker-agg")
 def broker_agg(date: Optional[str] = Query(default=None, description="YYYY-MM-DD")):
     path, eff = find_agg_on_or_before(date)
     if not path:
-        return {"date": None, "rows": []}
-    df = pd.read_csv(path)
-    return {"date": eff, "rows": safe_rows(df)}
+        return SafeJSONResponse({"date": None, "rows": []})
+    df = read_table_cached(path)
+    return SafeJSONResponse({"date": eff, "rows": safe_rows(df)})
 
 class _PredictGetResponse(PredictGetOut):
     pass
@@ -314,28 +584,28 @@ def predict_get(
         path = load_latest_file("daily_snapshot_*.csv")
     if not path:
         raise HTTPException(404, "Snapshot tidak ditemukan.")
-    df = pd.read_csv(path)
-    df["symbol"] = df["symbol"].astype(str).str.upper()
+    df = read_snapshot_slim(path)
     sym = symbol.upper().strip()
     sub = df[df["symbol"] == sym]
     if sub.empty:
         raise HTTPException(400, f"Symbol {sym} tidak ada di snapshot.")
-    row = sub.iloc[-1].to_dict()
+    row = sub.iloc[-1]  # Series langsung; tidak perlu dict perantara
     thr_raw = threshold if threshold is not None else ART.get("threshold_default", THRESHOLD_DEFAULT)
     thr = float(max(0.01, min(1.0, thr_raw)))
-    feats = build_feature_row_from_snapshot_row(row)
-    X = np.array([[feats[f] for f in ART["features"]]], dtype=float)
+    X = build_feature_vector_from_snapshot_row(row)
     proba = float(_clf_proba(ART["model"], X)[0])
     label = int(proba >= thr)
-    return _PredictGetResponse(
-        symbol=sym,
-        asof=str(row.get("date")),
-        prob_up=proba,
-        label=label,
-        threshold_used=thr,
-        target=ART.get("target"),
-        features_used=ART["features"],
-    )
+    # dict + orjson langsung: input sudah tervalidasi, tak perlu konstruksi
+    # model pydantic hanya untuk serialisasi (response_model tetap utk OpenAPI)
+    return SafeJSONResponse({
+        "symbol": sym,
+        "asof": str(row.get("date")),
+        "prob_up": proba,
+        "label": label,
+        "threshold_used": thr,
+        "target": ART.get("target"),
+        "features_used": list(FEATURES),
+    })
 
 @app.post("/predict", response_model=PredictOut)
 def predict_post(payload: PredictIn):
@@ -343,16 +613,16 @@ def predict_post(payload: PredictIn):
         raise HTTPException(503, "Model belum tersedia.")
     thr_raw = payload.threshold if payload.threshold is not None else ART.get("threshold_default", THRESHOLD_DEFAULT)
     thr = float(max(0.01, min(1.0, thr_raw)))
-    row = [float(payload.features.get(f, 0.0) or 0.0) for f in ART["features"]]
-    X = np.array([row], dtype=float)
+    row = [float(payload.features.get(f, 0.0) or 0.0) for f in FEATURES]
+    X = np.array([row], dtype=np.float32)
     proba = float(_clf_proba(ART["model"], X)[0])
-    return PredictOut(
-        prob_up=proba,
-        label=int(proba >= thr),
-        threshold_used=thr,
-        target=ART.get("target"),
-        features_used=ART["features"],
-    )
+    return SafeJSONResponse({
+        "prob_up": proba,
+        "label": int(proba >= thr),
+        "threshold_used": thr,
+        "target": ART.get("target"),
+        "features_used": list(FEATURES),
+    })
 
 @app.post("/predict-batch")
 def predict_batch(payload: PredictBatchIn):
@@ -367,11 +637,20 @@ def predict_batch(payload: PredictBatchIn):
         path = load_latest_file("daily_snapshot_*.csv")
     if not path:
         raise HTTPException(404, "Snapshot tidak ditemukan.")
-    snap = pd.read_csv(path)
     thr_raw = payload.threshold if payload.threshold is not None else ART.get("threshold_default", THRESHOLD_DEFAULT)
     thr = float(max(0.01, min(1.0, thr_raw)))
-    pred = predict_batch_from_snapshot(snap, threshold=thr, symbols=payload.symbols)
-    return {"rows": safe_rows(pred), "asof": os.path.basename(path)[15:-4], "threshold": thr}
+    pred = score_snapshot_cached(path)
+    if payload.symbols:
+        want = {s.upper() for s in payload.symbols}
+        if len(pred) >= PREDICT_BATCH_LIMIT:
+            # cache menyimpan skor yang terpotong PREDICT_BATCH_LIMIT
+            # SEBELUM filter simbol; skor ulang subsetnya supaya urutan
+            # filter-dulu-baru-cap tetap seperti semula
+            pred = score_batch_from_snapshot(read_snapshot_slim(path), symbols=payload.symbols)
+        else:
+            pred = pred[pred["symbol"].isin(want)].copy()
+    pred["label"] = (pred["prob_up"] >= thr).astype(int) if not pred.empty else []
+    return SafeJSONResponse({"rows": safe_rows(pred), "asof": os.path.basename(path)[15:-4], "threshold": thr})
 
 @app.get("/signals")
 def signals(
@@ -387,38 +666,23 @@ def signals(
     Tambahan: harga_now (dari snapshot terbaru) & kenaikan_pct sejak sinyal.
     """
     if ART is None:
-        return {"rows": [], "from": date_from, "to": date_to, "threshold": threshold}
+        return SafeJSONResponse({"rows": [], "from": date_from, "to": date_to, "threshold": threshold})
 
     thr = float(max(0.01, min(1.0, threshold)))  # clamp supaya tidak 0
 
-    # --- ambil harga terbaru dari snapshot paling akhir ---
-    latest_path = load_latest_file("daily_snapshot_*.csv")
-    latest_map: dict[str, float] = {}
-    if latest_path:
-        _ldf = pd.read_csv(latest_path)
-        if not _ldf.empty and "symbol" in _ldf.columns:
-            _ldf["symbol"] = _ldf["symbol"].astype(str).str.upper()
-            _ldf["close"] = pd.to_numeric(_ldf.get("close"), errors="coerce")
-            latest_map = (
-                _ldf.dropna(subset=["close"])
-                    .set_index("symbol")["close"]
-                    .astype(float)
-                    .to_dict()
-            )
+    # --- harga terbaru dari snapshot paling akhir (dimemo per file) ---
+    latest_map = latest_close_map()
 
     dates = pd.date_range(pd.to_datetime(date_from), pd.to_datetime(date_to), freq="D")
-    all_rows: List[Dict[str, Any]] = []
 
-    for d in dates:
-        dstr = d.strftime("%Y-%m-%d")
+    def _process_day(dstr: str) -> List[Dict[str, Any]]:
         path = os.path.join(DATA_DIR, f"daily_snapshot_{dstr}.csv")
         if not os.path.exists(path):
-            continue
+            return []
 
-        snap = pd.read_csv(path)
+        snap = read_snapshot_slim(path)
         if snap.empty or "symbol" not in snap.columns:
-            continue
-        snap["symbol"] = snap["symbol"].astype(str).str.upper()
+            return []
 
         # filter bar tidak valid untuk prediksi
         snap["close"] = pd.to_numeric(snap["close"], errors="coerce")
@@ -426,84 +690,120 @@ def signals(
 
         # join broker_agg hanya jika tanggalnya SAMA (hindari fitur stale)
         agg_path, eff = find_agg_on_or_before(dstr)
-        if agg_path and eff == dstr:
-            agg = pd.read_csv(agg_path)
-            if not agg.empty and "symbol" in agg.columns:
-                agg["symbol"] = agg["symbol"].astype(str).str.upper()
-                snap = snap.merge(agg, on="symbol", how="left", suffixes=("", "_agg"))
-
-        uniq = snap["symbol"].unique().tolist()[:limit_per_day]
-        sub = snap[snap["symbol"].isin(uniq)].copy()
-
-        pred = predict_batch_from_snapshot(sub, threshold=thr, symbols=None)
-        pred = pred.merge(sub, on=["symbol"], how="left")
-
-        for _, r in pred.iterrows():
-            sig = "BELI"
-            try:
-                if float(r.get("ret_1", 0) or 0) <= -0.05:
-                    sig = "JUAL KUAT"
-                elif float(r["prob_up"]) < thr:
-                    continue
-            except Exception:
-                if float(r["prob_up"]) < thr:
-                    continue
-
-            tb_conc_raw = r.get("top_buyer_concentration", 0)
-            try:
-                tb_conc = float(tb_conc_raw) if not pd.isna(tb_conc_raw) else 0.0
-            except Exception:
-                tb_conc = 0.0
-
-            akum = max(0.0, tb_conc * 100.0)      # 0..100
-            dist = max(0.0, 100.0 - akum)         # 0..100
-
-            # harga saat sinyal (hari dstr)
-            harga_raw = r.get("close", 0)
-            try:
-                harga = float(harga_raw) if not pd.isna(harga_raw) else 0.0
-            except Exception:
-                harga = 0.0
-
-            # harga terbaru dari snapshot paling akhir (fallback: harga sinyal)
-            sym = str(r["symbol"])
-            _hnow = latest_map.get(sym)
-            try:
-                harga_now = float(_hnow) if (_hnow is not None and np.isfinite(_hnow)) else harga
-            except Exception:
-                harga_now = harga
-
-            # % kenaikan sejak sinyal
-            kenaikan_pct = 0.0
-            if harga > 0 and harga_now > 0:
-                kenaikan_pct = (harga_now / harga - 1.0) * 100.0
-
-            alasan = (
-                "Stop loss: harga turun ≥5% dari penutupan"
-                if sig == "JUAL KUAT"
-                else f"Sinyal model • prob_up={float(r['prob_up']):.2f}"
-            )
-
-            all_rows.append({
-                "tanggal": dstr,
-                "saham": sym,
-                "sinyal": sig,
-                "harga": harga,
-                "harga_now": harga_now,           # NEW
-                "kenaikan_pct": kenaikan_pct,     # NEW
-                "akumulasi_pct": akum,
-                "distribusi_pct": dist,
-                "alasan": alasan,
-                "top_buyer": (None if pd.isna(r.get("top_buyer")) else str(r.get("top_buyer"))),
-            })
-
-    out = pd.DataFrame(all_rows)
-    return {
-        "rows": safe_rows(out) if not out.empty else [],
-        "from": date_from,
-        "to": date_to,
-        "threshold": thr,
-    }
+        same_day_agg = agg_path if (agg_path and eff == dstr) else None
+        if same_day_agg:
+            snap = _merge_agg_extras(snap, same_day_agg)
+
+        # skor model dimemo per (snapshot, agg) — hari yang sama tidak
+        # dihitung ulang antar request, dan frame yang diskor = frame
+        # gabungan yang sama dengan baris sinyal di bawah
+        scores = score_snapshot_cached(path, same_day_agg)
+        uniq = snap["symbol"].unique()
+        if len(uniq) > limit_per_day:
+            # filter isin hanya bila benar-benar melewati limit (jarang)
+            uniq = uniq[:limit_per_day]
+            snap = snap[snap["symbol"].isin(uniq)]
+            scores = scores[scores["symbol"].isin(uniq)]
+        pred = scores.merge(snap, on="symbol", how="left")
+
+        # --- bangun baris sinyal secara kolumnar (tanpa iterrows) ---
+        if "ret_1" in pred.columns:
+            ret1 = pd.to_numeric(pred["ret_1"], errors="coerce").fillna(0.0)
+        else:
+            ret1 = pd.Series(0.0, index=pred.index)
+        prob = pred["prob_up"].astype(float)
+        is_stop = ret1 <= -0.05
+        keep = is_stop | (prob >= thr)
+        if not keep.any():
+            return []
+
+        day = pred.loc[keep]
+        sym = day["symbol"].astype(str)
+        prob_k = prob.loc[keep]
+        stop_k = is_stop.loc[keep]
+
+        if "top_buyer_concentration" in day.columns:
+            conc = pd.to_numeric(day["top_buyer_concentration"], errors="coerce")
+        else:
+            conc = pd.Series(np.nan, index=day.index)
+        akum = (conc * 100.0).clip(lower=0.0).fillna(0.0)      # 0..100
+        dist = (100.0 - akum).clip(lower=0.0)                  # 0..100
+
+        # harga saat sinyal (hari dstr) & harga terbaru (fallback: harga sinyal)
+        harga = pd.to_numeric(day["close"], errors="coerce").fillna(0.0)
+        harga_now = sym.map(latest_map).fillna(harga)
+
+        # % kenaikan sejak sinyal
+        kenaikan_pct = np.where(
+            (harga > 0) & (harga_now > 0),
+            (harga_now / harga - 1.0) * 100.0,
+            0.0,
+        )
+
+        alasan = np.where(
+            stop_k,
+            "Stop loss: harga turun ≥5% dari penutupan",
+            "Sinyal model • prob_up=" + prob_k.map("{:.2f}".format),
+        )
+
+        if "top_buyer" in day.columns:
+            top_buyer = np.where(day["top_buyer"].isna(), None, day["top_buyer"].astype(str))
+        else:
+            top_buyer = np.full(len(day), None, dtype=object)
+
+        day_out = pd.DataFrame({
+            "tanggal": dstr,
+            "saham": sym.to_numpy(),
+            "sinyal": np.where(stop_k, "JUAL KUAT", "BELI"),
+            "harga": harga.to_numpy(),
+            "harga_now": harga_now.to_numpy(),
+            "kenaikan_pct": kenaikan_pct,
+            "akumulasi_pct": akum.to_numpy(),
+            "distribusi_pct": dist.to_numpy(),
+            "alasan": alasan,
+            "top_buyer": top_buyer,
+        })
+        return day_out.to_dict(orient="records")
+
+    date_strs = [d.strftime("%Y-%m-%d") for d in dates]
+
+    # satu batch predict untuk semua hari yang belum ada di cache skor;
+    # pasangkan agg tanggal sama supaya kunci cache cocok dengan _process_day
+    pairs: List[Tuple[str, Optional[str]]] = []
+    for d in date_strs:
+        p = os.path.join(DATA_DIR, f"daily_snapshot_{d}.csv")
+        if not os.path.exists(p):
+            continue
+        ap, eff = find_agg_on_or_before(d)
+        pairs.append((p, ap if (ap and eff == d) else None))
+    prewarm_scores(pairs)
+
+    opts = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    # trailer meta JSON: b'{"from":...}' -> b'],"from":...}'
+    trailer = b"]," + orjson.dumps(
+        {"from": date_from, "to": date_to, "threshold": thr}, option=opts
+    )[1:]
+
+    def _stream():
+        # stream array rows per hari: memori flat, klien bisa mulai parse
+        # lebih awal; shape JSON tetap {"rows":[...], "from", "to", "threshold"}
+        yield b'{"rows":['
+        first = True
+        # hari-hari independen; pandas/sklearn melepas GIL di bagian beratnya
+        # cap 8 worker: di atas itu kontensi I/O + GIL justru memperlambat.
+        # clamp >= 1: range kosong (from > to) tetap 200 + rows kosong,
+        # bukan ValueError di tengah stream yang sudah kirim status line
+        with ThreadPoolExecutor(max_workers=max(1, min(len(date_strs), 8, os.cpu_count() or 4))) as ex:
+            for day_rows in ex.map(_process_day, date_strs):
+                for row in day_rows:
+                    if first:
+                        first = False
+                    else:
+                        yield b","
+                    yield orjson.dumps(row, option=opts)
+        yield trailer
+
+    return StreamingResponse(_stream(), media_type="application/json")
 
 # === NEW: EXPLAIN endpoint ===
 @app.get("/explain")
@@ -532,10 +832,9 @@ def explain(
     if not path:
         raise HTTPException(404, f"Snapshot tidak ditemukan (date={date or 'latest'}).")
 
-    df = pd.read_csv(path)
+    df = read_table_cached(path)
     if df.empty or "symbol" not in df.columns:
         raise HTTPException(404, "Snapshot kosong atau tidak valid.")
-    df["symbol"] = df["symbol"].astype(str).str.upper()
 
     row_df = df[df["symbol"] == sym]
     if row_df.empty:
@@ -551,9 +850,8 @@ def explain(
     if (pd.isna(top_buyer) or "top_buyer" not in row_df.columns) and eff_date:
         agg_path, agg_eff = find_agg_on_or_before(eff_date)
         if agg_path and agg_eff == eff_date:
-            agg = pd.read_csv(agg_path)
+            agg = read_table_cached(agg_path)
             if "symbol" in agg.columns:
-                agg["symbol"] = agg["symbol"].astype(str).str.upper()
                 a = agg[agg["symbol"] == sym]
                 if not a.empty:
                     arow = a.iloc[-1].to_dict()
@@ -581,8 +879,7 @@ def explain(
     if ART is not None:
         thr_raw = threshold if threshold is not None else ART.get("threshold_default", THRESHOLD_DEFAULT)
         thr = float(max(0.01, min(1.0, thr_raw)))
-        feats = build_feature_row_from_snapshot_row(row)
-        X = np.array([[feats.get(f, 0.0) for f in ART["features"]]], dtype=float)
+        X = build_feature_vector_from_snapshot_row(row)
         prob_up = float(_clf_proba(ART["model"], X)[0])
         label = int(prob_up >= thr)
     else:
@@ -632,7 +929,7 @@ def explain(
         .replace(",", ".")  # format lokal ID sederhana
     )
 
-    return {
+    return SafeJSONResponse({
         "symbol": sym,
         "date": str(eff_date or row.get("date") or ""),
         "close": close,
@@ -646,4 +943,4 @@ def explain(
         "threshold_used": thr,
         "reason_simple": reason_simple,
         "bullets": bullets,
-    }
+    })
@@ -13,7 +13,9 @@ import re
 import glob
 import time
 import random
+import hashlib
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
 import pandas as pd
 import numpy as np
@@ -45,9 +47,32 @@ RETRY_BACKOFF_MIN  = float(os.environ.get("RETRY_BACKOFF_MIN", "0.5"))
 RETRY_BACKOFF_MAX  = float(os.environ.get("RETRY_BACKOFF_MAX", "1.5"))
 RATE_LIMIT_SLEEP   = float(os.environ.get("RATE_LIMIT_SLEEP", "0.03"))
 
+# Dump vendor di atas ambang ini dibaca streaming per-chunk (RSS terikat
+# ukuran chunk, bukan ukuran file) lalu direduksi per simbol secara inkremental
+VENDOR_STREAM_MB   = int(os.environ.get("VENDOR_STREAM_MB", "256"))
+VENDOR_CHUNK_ROWS  = int(os.environ.get("VENDOR_CHUNK_ROWS", "200000"))
+
 # ---------- Utils ----------
+# Regex dikompilasi sekali di module level (bukan per panggilan/per kolom)
+_NORM_RE   = re.compile(r"[^a-z0-9]")
+_WS_RE     = re.compile(r"\s+")
+_TICKER_RE = re.compile(r"^[A-Z]{2,6}(?:[.\-]?[A-Z0-9]{0,2})?$")
+
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _norm_date_series(s: pd.Series) -> pd.Series:
+    """Normalisasi kolom tanggal ke 'YYYY-MM-DD'. Kolom yang sudah ISO
+    diloloskan lewat satu pass cek regex — tanpa round-trip parse+strftime
+    yang mendominasi waktu per-baris di frame besar."""
+    s = s.astype(str)
+    if s.str.fullmatch(_ISO_DATE_RE).all():
+        return s
+    return pd.to_datetime(s, errors="coerce").dt.strftime("%Y-%m-%d")
+
+@lru_cache(maxsize=4096)
 def _norm(s: str) -> str:
-    return re.sub(r"[^a-z0-9]", "", str(s).strip().lower())
+    # dimemo: nama kolom yang sama dinormalisasi berkali-kali lintas file
+    return _NORM_RE.sub("", str(s).strip().lower())
 
 def _first_match(cols_norm, candidates):
     for cand in candidates:
@@ -69,15 +94,33 @@ def _pick_latest_csv(path: str) -> Optional[str]:
     candidates.sort(key=lambda p: os.path.getmtime(p), reverse=True)
     return candidates[0]
 
+_SESSION = None
+
+def _http_session():
+    """Session requests dengan connection pool (keep-alive): handshake
+    TCP+TLS dibayar per koneksi yang dipakai ulang, bukan per request.
+    Thread-safe untuk GET paralel."""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS * 2, max_retries=0)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        _SESSION = s
+    return _SESSION
+
 def _http_get_json(url: str, params: Dict[str, Any], timeout: float) -> Dict[str, Any]:
-    import requests
     last_err = None
     for attempt in range(1, MAX_RETRY + 1):
         try:
-            r = requests.get(url, params=params, timeout=timeout, headers={"User-Agent": "idx-ingest/1.1"})
+            r = _http_session().get(url, params=params, timeout=timeout, headers={"User-Agent": "idx-ingest/1.1"})
             if r.status_code == 200:
                 try:
-                    return r.json()
+                    # parse bytes langsung via orjson (bila ada) — lewati
+                    # deteksi encoding + parser stdlib milik r.json()
+                    return _js_loads(r.content)
                 except Exception:
                     raise RuntimeError(f"Non-JSON response: {r.text[:200]}")
             else:
@@ -96,21 +139,50 @@ def _read_symbols() -> pd.DataFrame:
     path = os.path.join(DATA_DIR, "nama_saham.csv")
     if not os.path.exists(path):
         raise FileNotFoundError(f"File simbol tidak ditemukan: {path}")
-    df = pd.read_csv(path)
-    cols_norm = {_norm(c): c for c in df.columns}
+    # memo per (path, mtime): dalam proses via lru_cache, antar proses via
+    # parquet di .cache — heuristik deteksi kolom tak diulang selama file
+    # nama_saham tidak berubah
+    return _read_symbols_cached(path, os.path.getmtime(path)).copy(deep=False)
+
+@lru_cache(maxsize=4)
+def _read_symbols_cached(path: str, mtime: float) -> pd.DataFrame:
+    cache_pq = os.path.join(DATA_DIR, ".cache", "symbols.parquet")
+    if pa is not None and os.path.exists(cache_pq) and os.path.getmtime(cache_pq) >= mtime:
+        try:
+            out = pd.read_parquet(cache_pq)
+            print(f"[ingest] symbols: {len(out)} (cache). contoh: {out['symbol'].head(5).tolist()}")
+            return out
+        except Exception:
+            pass  # cache korup: bangun ulang dari CSV
+    out = _read_symbols_uncached(path)
+    if pa is not None:
+        try:
+            os.makedirs(os.path.dirname(cache_pq), exist_ok=True)
+            out.to_parquet(cache_pq, engine="pyarrow", index=False)
+        except Exception:
+            pass
+    return out
+
+def _read_symbols_uncached(path: str) -> pd.DataFrame:
+    # baca header dulu; kalau kolom simbol ketahuan, parse hanya kolom itu
+    header = pd.read_csv(path, nrows=0)
+    cols_norm = {_norm(c): c for c in header.columns}
     candidates = [
         "symbol", "symbols", "ticker", "code", "tickercode",
         "kode", "kodesaham", "stock", "stocksymbol", "emiten", "kodeemiten"
     ]
     key = _first_match(cols_norm, candidates)
+    df = pd.read_csv(path, usecols=[key]) if key else pd.read_csv(path)
 
     if key is None:
         def ticker_like_ratio(series: pd.Series) -> float:
-            s = series.astype(str).str.strip()
-            s = s.str.replace(r"\s+", "", regex=True).str.upper()
-            pat = re.compile(r"^[A-Z]{2,6}(?:[.\-]?[A-Z0-9]{0,2})?$")
-            valid = s.str.fullmatch(pat).fillna(False)
-            return valid.mean()
+            # satu loop di atas array numpy: tanpa 3x Series .str.* antara
+            vals = series.to_numpy(dtype=object)
+            if not len(vals):
+                return 0.0
+            sub, fullmatch = _WS_RE.sub, _TICKER_RE.fullmatch
+            hits = sum(1 for v in vals if fullmatch(sub("", str(v)).upper()))
+            return hits / len(vals)
         ratios = {c: ticker_like_ratio(df[c]) for c in df.columns}
         candidates_auto = [c for c, r in ratios.items() if r >= 0.6]
         if candidates_auto:
@@ -129,26 +201,39 @@ def _read_symbols() -> pd.DataFrame:
     out = df[[key]].rename(columns={key: "symbol"}).copy()
     out["symbol"] = (
         out["symbol"].astype(str)
-        .str.replace(r"\s+", "", regex=True)
+        .str.replace(_WS_RE, "", regex=True)
         .str.upper()
     )
     out = out[out["symbol"].str.len() > 0].drop_duplicates("symbol").sort_values("symbol").reset_index(drop=True)
     if out.empty:
         raise RuntimeError("Daftar simbol kosong setelah normalisasi. Cek isi nama_saham.csv Anda.")
     print(f"[ingest] symbols: {len(out)} ditemukan. contoh: {out['symbol'].head(5).tolist()}")
+    # kategori: merge/groupby downstream pakai kode int, bukan string penuh
+    out["symbol"] = out["symbol"].astype("category")
     return out
 
 # ---------- Vendor CSV ----------
+# PyArrow (opsional): parse CSV multi-thread + kernel string SIMD.
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.compute as pc
+except Exception:
+    pa = pacsv = pc = None
+
 def _read_vendor_maybe(vendor_hint: Optional[str], asof: str) -> pd.DataFrame:
     path = _pick_latest_csv(vendor_hint) if vendor_hint else None
     if path is None:
         print(f"[ingest] vendor CSV tidak ditemukan (hint: {vendor_hint}).")
         return pd.DataFrame(columns=["symbol", "close", "volume", "date"])
-    df = pd.read_csv(path)
-    lowmap = {_norm(c): c for c in df.columns}
 
-    def pick(*names):
-        for n in names:
+    # resolve kolom dari header saja, lalu parse hanya kolom yang dipakai —
+    # dump vendor yang lebar tidak membayar parse kolom buangan
+    names = list(pd.read_csv(path, nrows=0).columns)
+    lowmap = {_norm(c): c for c in names}
+
+    def pick(*cands):
+        for n in cands:
             nn = _norm(n)
             if nn in lowmap:
                 return lowmap[nn]
@@ -160,23 +245,147 @@ def _read_vendor_maybe(vendor_hint: Optional[str], asof: str) -> pd.DataFrame:
     c_vol = pick("volume", "vol")
 
     if c_sym is None or c_clo is None:
-        avail = ", ".join([str(c) for c in df.columns])
+        avail = ", ".join([str(c) for c in names])
         print("[ingest] WARNING: CSV vendor tidak punya minimal kolom (symbol & close). "
               f"Kolom tersedia: [{avail}]. Melewati vendor.")
         return pd.DataFrame(columns=["symbol", "close", "volume", "date"])
 
-    out = pd.DataFrame({
-        "symbol": df[c_sym].astype(str).str.replace(r"\s+", "", regex=True).str.upper(),
-        "close": pd.to_numeric(df[c_clo], errors="coerce"),
-        "volume": pd.to_numeric(df[c_vol], errors="coerce") if c_vol else np.nan,
-    })
-    if c_dat:
-        out["date"] = pd.to_datetime(df[c_dat], errors="coerce").dt.strftime("%Y-%m-%d")
+    wanted = [c for c in (c_sym, c_dat, c_clo, c_vol) if c]
+
+    if os.path.getsize(path) > VENDOR_STREAM_MB * (1 << 20):
+        return _read_vendor_streaming(path, wanted, c_sym, c_dat, c_clo, c_vol)
+
+    tbl = None
+    if pacsv is not None:
+        try:
+            tbl = pacsv.read_csv(
+                path, convert_options=pacsv.ConvertOptions(include_columns=wanted)
+            )
+        except Exception:
+            tbl = None  # CSV aneh: jatuh ke parser pandas
+    if tbl is None:
+        # memory_map: baca langsung dari page cache tanpa salinan buffer user-space
+        df = pd.read_csv(path, usecols=wanted, memory_map=True)
+
+    if tbl is not None:
+        # normalisasi simbol di kernel Arrow (kolumnar, bukan loop objek Python)
+        sym = pc.utf8_upper(
+            pc.replace_substring_regex(pc.cast(tbl[c_sym], pa.string()), r"\s+", "")
+        )
+        out = pd.DataFrame({
+            "symbol": sym.to_pandas().fillna(""),
+            "close": pd.to_numeric(tbl[c_clo].to_pandas(), errors="coerce"),
+            "volume": pd.to_numeric(tbl[c_vol].to_pandas(), errors="coerce") if c_vol else np.nan,
+        })
+        if c_dat:
+            out["date"] = _norm_date_series(tbl[c_dat].to_pandas())
+    else:
+        out = pd.DataFrame({
+            "symbol": df[c_sym].astype(str).str.replace(_WS_RE, "", regex=True).str.upper(),
+            "close": pd.to_numeric(df[c_clo], errors="coerce"),
+            "volume": pd.to_numeric(df[c_vol], errors="coerce") if c_vol else np.nan,
+        })
+        if c_dat:
+            out["date"] = _norm_date_series(df[c_dat])
     out = out[out["symbol"].str.len() > 0].copy()
     print(f"[ingest] vendor rows: {len(out)} | source: {path}")
     return out
 
+def _read_vendor_streaming(path: str, wanted, c_sym, c_dat, c_clo, c_vol) -> pd.DataFrame:
+    """
+    Baca dump vendor besar per-chunk dan reduksi inkremental per simbol:
+    close/date = nilai non-null terakhir, volume = jumlah (min_count=1).
+    Pembersihan baris (close<=0 -> NaN, volume<0 -> 0) dicerminkan dari main()
+    supaya hasil reduksi identik dengan jalur baca-penuh + groupby.
+    """
+    last = None       # per simbol: close/date non-null terakhir
+    vol_sum = None    # per simbol: akumulasi volume
+    vol_n = None      # per simbol: jumlah nilai volume non-null (untuk min_count)
+    n_rows = 0
+    for chunk in pd.read_csv(path, usecols=wanted, chunksize=VENDOR_CHUNK_ROWS, memory_map=True):
+        out = pd.DataFrame({
+            "symbol": chunk[c_sym].astype(str).str.replace(_WS_RE, "", regex=True).str.upper(),
+            "close": pd.to_numeric(chunk[c_clo], errors="coerce"),
+            "volume": pd.to_numeric(chunk[c_vol], errors="coerce") if c_vol else np.nan,
+        })
+        if c_dat:
+            out["date"] = _norm_date_series(chunk[c_dat])
+        out = out[out["symbol"].str.len() > 0]
+        if out.empty:
+            continue
+        n_rows += len(out)
+        out.loc[(out["close"] <= 0) | (out["close"].isna()), "close"] = np.nan
+        if c_vol:
+            out.loc[out["volume"] < 0, "volume"] = 0
+
+        g = out.groupby("symbol", sort=False)
+        cols = ["close"] + (["date"] if c_dat else [])
+        chunk_last = g[cols].last()  # last = nilai non-null terakhir (semantik agg "last")
+        chunk_vol = g["volume"].sum(min_count=1)
+        chunk_vn = g["volume"].count()
+
+        # chunk terbaru menang bila non-null; kalau tidak, pertahankan yang lama
+        last = chunk_last if last is None else chunk_last.combine_first(last)
+        vol_sum = chunk_vol if vol_sum is None else chunk_vol.add(vol_sum, fill_value=0)
+        vol_n = chunk_vn if vol_n is None else chunk_vn.add(vol_n, fill_value=0)
+
+    if last is None:
+        return pd.DataFrame(columns=["symbol", "close", "volume", "date"])
+    out = last
+    # min_count=1 lintas chunk: simbol tanpa satu pun volume non-null tetap NaN
+    out["volume"] = vol_sum.where(vol_n > 0)
+    out = out.reset_index()
+    print(f"[ingest] vendor rows: {n_rows} (streamed, {len(out)} simbol) | source: {path}")
+    return out
+
 # ---------- GoAPI fetch ----------
+# aiohttp (opsional): satu event loop, ratusan request in-flight.
+# Tanpa aiohttp, fetch jatuh ke jalur ThreadPoolExecutor lama.
+try:
+    import goapi_async as _goapi_async
+except Exception:
+    _goapi_async = None
+
+# Cache on-disk respons historical GoAPI. Bar masa lalu tidak berubah,
+# jadi run harian berikutnya cukup fetch jendela yang bergeser saja.
+# orjson (opsional) untuk encode/decode file cache; fallback json stdlib.
+try:
+    import orjson as _oj
+    def _js_loads(b): return _oj.loads(b)
+    def _js_dumps(o): return _oj.dumps(o)
+except Exception:
+    import json as _stdjson
+    def _js_loads(b): return _stdjson.loads(b)
+    def _js_dumps(o): return _stdjson.dumps(o).encode()
+
+_CACHE_DIR = os.path.join(DATA_DIR, ".cache", "goapi")
+
+def _goapi_cache_path(symbol: str, start: str, end: str) -> str:
+    key = hashlib.blake2b(f"{symbol}|{start}|{end}".encode(), digest_size=16).hexdigest()
+    return os.path.join(_CACHE_DIR, f"{key}.json")
+
+def _goapi_cache_get(symbol: str, start: str, end: str):
+    try:
+        with open(_goapi_cache_path(symbol, start, end), "rb") as f:
+            return _js_loads(f.read())
+    except Exception:
+        return None
+
+def _goapi_cache_put(symbol: str, start: str, end: str, js) -> None:
+    # hanya jendela yang berakhir di masa lalu: data hari berjalan masih
+    # bisa berubah intraday, jangan dibekukan di cache
+    try:
+        if end >= datetime.utcnow().date().isoformat():
+            return
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        path = _goapi_cache_path(symbol, start, end)
+        tmp = f"{path}.tmp.{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(_js_dumps(js))
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
 def _http_first_list(obj: Any):
     if isinstance(obj, list) and obj and isinstance(obj[0], dict):
         return obj
@@ -187,19 +396,26 @@ def _http_first_list(obj: Any):
                 return res
     return None
 
-def _goapi_fetch_one(symbol: str, asof: str, lookback_days: int) -> Dict[str, Any]:
+def _goapi_window(asof: str, lookback_days: int) -> tuple[str, str]:
     try:
         end = datetime.strptime(asof, "%Y-%m-%d").date()
     except ValueError:
         end = datetime.utcnow().date()
     start = end - timedelta(days=max(1, lookback_days))
+    return start.isoformat(), end.isoformat()
+
+def _goapi_request(symbol: str, asof: str, lookback_days: int):
+    """(url, params) untuk historical bars satu simbol — dipakai jalur
+    sync maupun async."""
+    start, end = _goapi_window(asof, lookback_days)
     url = f"{GOAPI_BASE_URL}/stock/idx/{symbol}/historical"
-    params = {"from": start.isoformat(), "to": end.isoformat(), "api_key": GOAPI_API_KEY}
-    js = _http_get_json(url, params, timeout=REQ_TIMEOUT_SEC)
+    return url, {"from": start, "to": end, "api_key": GOAPI_API_KEY}
+
+def _goapi_parse(symbol: str, asof: str, js: Dict[str, Any]) -> Dict[str, Any]:
     rows = _http_first_list(js) or []
     if not rows:
         return {"symbol": symbol, "date": asof, "close": np.nan, "volume": np.nan}
-    df = pd.DataFrame(rows).copy()
+    df = pd.DataFrame(rows)  # frame baru dari list-of-dict; tak perlu copy
     lower = {c.lower(): c for c in df.columns}
 
     def norm(cands, dst):
@@ -214,7 +430,7 @@ def _goapi_fetch_one(symbol: str, asof: str, lookback_days: int) -> Dict[str, An
     norm(["close", "c", "last", "close_price", "price"], "close")
     norm(["volume", "v", "vol"], "volume")
 
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    df["date"] = _norm_date_series(df["date"])
     df["close"] = pd.to_numeric(df["close"], errors="coerce")
     df["volume"] = pd.to_numeric(df["volume"], errors="coerce")
 
@@ -235,23 +451,63 @@ def _goapi_fetch_one(symbol: str, asof: str, lookback_days: int) -> Dict[str, An
         "volume": float(r.get("volume")) if pd.notna(r.get("volume")) else np.nan,
     }
 
+def _goapi_fetch_one(symbol: str, asof: str, lookback_days: int) -> Dict[str, Any]:
+    start, end = _goapi_window(asof, lookback_days)
+    js = _goapi_cache_get(symbol, start, end)
+    if js is None:
+        url, params = _goapi_request(symbol, asof, lookback_days)
+        js = _http_get_json(url, params, timeout=REQ_TIMEOUT_SEC)
+        _goapi_cache_put(symbol, start, end, js)
+    return _goapi_parse(symbol, asof, js)
+
 def _goapi_fetch_all(symbols: List[str], asof: str, lookback_days: int) -> pd.DataFrame:
     if not GOAPI_API_KEY:
         print("[ingest] GOAPI_API_KEY belum di-set. Tidak bisa fetch dari GoAPI.")
         return pd.DataFrame(columns=["symbol", "date", "close", "volume"])
-    from concurrent.futures import ThreadPoolExecutor, as_completed
     out_rows: List[Dict[str, Any]] = []
     errs = 0
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-        futs = {ex.submit(_goapi_fetch_one, sym, asof, lookback_days): sym for sym in symbols}
-        for fut in as_completed(futs):
-            sym = futs[fut]
+    start, end = _goapi_window(asof, lookback_days)
+    cached = {sym: js for sym in symbols if (js := _goapi_cache_get(sym, start, end)) is not None}
+    to_fetch = [sym for sym in symbols if sym not in cached]
+    if cached:
+        print(f"[ingest] cache GoAPI: {len(cached)} hit, {len(to_fetch)} fetch.")
+    if _goapi_async is not None and to_fetch:
+        fetched = _goapi_async.fetch_all_json(
+            [_goapi_request(sym, asof, lookback_days) for sym in to_fetch],
+            concurrency=MAX_WORKERS, timeout_sec=REQ_TIMEOUT_SEC,
+            max_retry=MAX_RETRY, backoff_min=RETRY_BACKOFF_MIN,
+            backoff_max=RETRY_BACKOFF_MAX, rate_sleep=RATE_LIMIT_SLEEP,
+            user_agent="idx-ingest/1.1",
+        )
+        for sym, res in zip(to_fetch, fetched):
+            if not isinstance(res, Exception):
+                _goapi_cache_put(sym, start, end, res)
+        by_sym = dict(zip(to_fetch, fetched))
+        results = [cached.get(sym, by_sym.get(sym)) for sym in symbols]
+    elif _goapi_async is not None:
+        results = [cached[sym] for sym in symbols]
+    else:
+        results = None
+    if results is not None:
+        for sym, res in zip(symbols, results):
             try:
-                row = fut.result()
-                out_rows.append(row)
+                if isinstance(res, Exception):
+                    raise res
+                out_rows.append(_goapi_parse(sym, asof, res))
             except Exception:
                 errs += 1
                 out_rows.append({"symbol": sym, "date": asof, "close": np.nan, "volume": np.nan})
+    else:
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            futs = {ex.submit(_goapi_fetch_one, sym, asof, lookback_days): sym for sym in symbols}
+            for fut in as_completed(futs):
+                sym = futs[fut]
+                try:
+                    out_rows.append(fut.result())
+                except Exception:
+                    errs += 1
+                    out_rows.append({"symbol": sym, "date": asof, "close": np.nan, "volume": np.nan})
     if errs:
         print(f"[ingest] WARNING: {errs} simbol gagal diambil dari GoAPI (diisi NaN).")
     df = pd.DataFrame(out_rows)
@@ -300,14 +556,25 @@ def main(asof: str, vendor_hint: Optional[str]):
         vendor_df.loc[(vendor_df["close"] <= 0) | (vendor_df["close"].isna()), "close"] = np.nan
         vendor_df.loc[vendor_df["volume"] < 0, "volume"] = 0
 
-        def _sum_min_count(s: pd.Series):
-            return s.sum(min_count=1)
-        vendor_df = vendor_df.groupby("symbol", as_index=False).agg({
-            "date": "last",
-            "close": "last",
-            "volume": _sum_min_count,
-            "source_date": "last"
-        })
+        # samakan dtype kategori kedua sisi merge; tanpa ini pandas jatuh
+        # balik ke object dan keuntungan kode int hilang
+        key_dtype = pd.CategoricalDtype(
+            pd.Index(syms_df["symbol"].cat.categories).union(pd.unique(vendor_df["symbol"].astype(str)))
+        )
+        syms_df["symbol"] = syms_df["symbol"].astype(key_dtype)
+        vendor_df["symbol"] = vendor_df["symbol"].astype(key_dtype)
+
+        # GoAPI & jalur streaming sudah menjamin satu baris per simbol;
+        # groupby reduksi hanya perlu saat masih ada duplikat
+        if not vendor_df["symbol"].is_unique:
+            def _sum_min_count(s: pd.Series):
+                return s.sum(min_count=1)
+            vendor_df = vendor_df.groupby("symbol", as_index=False, observed=True).agg({
+                "date": "last",
+                "close": "last",
+                "volume": _sum_min_count,
+                "source_date": "last"
+            })
 
     merged = syms_df.merge(vendor_df, on="symbol", how="left")
     merged["date"] = merged["date"].fillna(asof)
@@ -315,10 +582,20 @@ def main(asof: str, vendor_hint: Optional[str]):
         merged["source_date"] = asof
 
     out = merged[["symbol", "date", "close", "volume", "source_date"]].copy()
+    if isinstance(out["symbol"].dtype, pd.CategoricalDtype):
+        out["symbol"] = out["symbol"].astype(out["symbol"].cat.categories.dtype)
     out_path = os.path.join(DATA_DIR, f"prices_{asof}.csv")
     out.to_csv(out_path, index=False)
     print(f"[ingest] wrote {len(out):,} rows -> {out_path}")
 
+    # Sibling Parquet (konvensi pipelines/migrate_to_parquet.py): pembaca
+    # memilihnya bila tidak lebih tua dari CSV. CSV tetap format kanonik.
+    if pa is not None:
+        try:
+            out.to_parquet(os.path.splitext(out_path)[0] + ".parquet", engine="pyarrow", index=False)
+        except Exception as e:
+            print(f"[ingest] WARNING: gagal tulis Parquet sibling: {e}")
+
     missing_close = int(out["close"].isna().sum())
     n_asof = int((out["source_date"] == asof).sum())
     n_fallback = len(out) - n_asof
@@ -1,13 +1,29 @@
 import os
+import re
 import sys
 import time
 import random
 from datetime import datetime, timedelta
+from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
 
+# PyArrow (opsional): untuk sibling Parquet di samping CSV kanonik
+try:
+    import pyarrow as pa
+except Exception:
+    pa = None
+
+# orjson (opsional): parse respons GoAPI dari bytes, ~2-3x parser stdlib
+try:
+    import orjson as _oj
+    def _js_loads(b): return _oj.loads(b)
+except Exception:
+    import json as _stdjson
+    def _js_loads(b): return _stdjson.loads(b)
+
 # ==== Load .env (opsional) ====
 try:
     from dotenv import load_dotenv, find_dotenv
@@ -40,15 +56,46 @@ RATE_LIMIT_SLEEP = float(os.environ.get("RATE_LIMIT_SLEEP", "0.03"))
 def log(msg: str) -> None:
     print(msg, flush=True)
 
+# Regex dikompilasi sekali di module level (bukan per kolom/per panggilan)
+_JK_SUFFIX_RE = re.compile(r"\.JK$")
+_TICKER_RE = re.compile(r"[A-Z]{2,5}")
+
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _norm_date_series(s: pd.Series) -> pd.Series:
+    """Normalisasi kolom tanggal ke 'YYYY-MM-DD'. Kolom yang sudah ISO
+    diloloskan lewat satu pass cek regex — tanpa round-trip parse+strftime
+    yang mendominasi waktu per-baris di frame besar."""
+    s = s.astype(str)
+    if s.str.fullmatch(_ISO_DATE_RE).all():
+        return s
+    return pd.to_datetime(s, errors="coerce").dt.strftime("%Y-%m-%d")
+
+_SESSION = None
+
+def _http_session():
+    """Session requests dengan connection pool (keep-alive): handshake
+    TCP+TLS dibayar per koneksi yang dipakai ulang, bukan per request.
+    Thread-safe untuk GET paralel."""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS * 2, max_retries=0)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        _SESSION = s
+    return _SESSION
+
 def _http_get_json(url: str, params: dict) -> dict:
-    import requests
     last_err = None
     for attempt in range(1, MAX_RETRY + 1):
         try:
-            r = requests.get(url, params=params, timeout=REQ_TIMEOUT_SEC, headers={"User-Agent": "idx-broker-agg/1.3"})
+            r = _http_session().get(url, params=params, timeout=REQ_TIMEOUT_SEC, headers={"User-Agent": "idx-broker-agg/1.3"})
             if r.status_code == 200:
                 try:
-                    return r.json()
+                    return _js_loads(r.content)
                 except Exception:
                     raise RuntimeError(f"Non-JSON response: {r.text[:200]}")
             else:
@@ -84,24 +131,46 @@ def _first_list(obj):
 def _load_symbols() -> list[str]:
     for p in ["nama_saham.csv", os.path.join(DATA_DIR, "nama_saham.csv")]:
         if os.path.exists(p):
-            df = pd.read_csv(p)
-            low = {str(c).strip().lower(): c for c in df.columns}
-            pick = None
-            for k in ("symbol", "ticker", "code", "kode", "emiten", "kodesaham", "kode emiten"):
-                if k in low:
-                    pick = low[k]; break
-            if pick is None:
-                best, best_ratio = None, -1.0
-                for c in df.columns:
-                    vals = df[c].astype(str).str.strip().str.upper().str.replace(r"\.JK$", "", regex=True)
-                    ratio = vals.str.fullmatch(r"[A-Z]{2,5}").mean()
-                    if ratio > best_ratio: best_ratio, best = ratio, c
-                pick = best
-            syms = (df[pick].astype(str).str.strip().str.upper().str.replace(r"\.JK$", "", regex=True))
-            syms = syms[syms.str.fullmatch(r"[A-Z]{2,5}")].dropna().unique().tolist()
-            return sorted(syms)
+            # memo per (path, mtime): heuristik deteksi kolom & regex tak
+            # diulang selama nama_saham tidak berubah (cache parquet lintas run)
+            return list(_load_symbols_cached(p, os.path.getmtime(p)))
     raise FileNotFoundError("nama_saham.csv tidak ditemukan (root atau ./data)")
 
+@lru_cache(maxsize=4)
+def _load_symbols_cached(p: str, mtime: float) -> tuple:
+    cache_pq = os.path.join(DATA_DIR, ".cache", "symbols_broker.parquet")
+    if pa is not None and os.path.exists(cache_pq) and os.path.getmtime(cache_pq) >= mtime:
+        try:
+            return tuple(pd.read_parquet(cache_pq)["symbol"].tolist())
+        except Exception:
+            pass  # cache korup: bangun ulang dari CSV
+    syms = _load_symbols_uncached(p)
+    if pa is not None:
+        try:
+            os.makedirs(os.path.dirname(cache_pq), exist_ok=True)
+            pd.DataFrame({"symbol": syms}).to_parquet(cache_pq, engine="pyarrow", index=False)
+        except Exception:
+            pass
+    return tuple(syms)
+
+def _load_symbols_uncached(p: str) -> list[str]:
+    df = pd.read_csv(p)
+    low = {str(c).strip().lower(): c for c in df.columns}
+    pick = None
+    for k in ("symbol", "ticker", "code", "kode", "emiten", "kodesaham", "kode emiten"):
+        if k in low:
+            pick = low[k]; break
+    if pick is None:
+        best, best_ratio = None, -1.0
+        for c in df.columns:
+            vals = df[c].astype(str).str.strip().str.upper().str.replace(_JK_SUFFIX_RE, "", regex=True)
+            ratio = vals.str.fullmatch(_TICKER_RE).mean()
+            if ratio > best_ratio: best_ratio, best = ratio, c
+        pick = best
+    syms = (df[pick].astype(str).str.strip().str.upper().str.replace(_JK_SUFFIX_RE, "", regex=True))
+    syms = syms[syms.str.fullmatch(_TICKER_RE)].dropna().unique().tolist()
+    return sorted(syms)
+
 def _guess_latest_trading_date(asof: str) -> str:
     """
     Cari tanggal trading terakhir <= asof dari file prices_*.csv.
@@ -116,9 +185,10 @@ def _guess_latest_trading_date(asof: str) -> str:
         p = os.path.join(DATA_DIR, f"prices_{d}.csv")
         if os.path.exists(p):
             try:
-                dfp = pd.read_csv(p)
+                # hanya kolom source_date yang dipakai — tak usah parse sisanya
+                dfp = pd.read_csv(p, usecols=lambda c: c == "source_date", memory_map=True)
                 if "source_date" in dfp.columns and dfp["source_date"].notna().any():
-                    sd = pd.to_datetime(dfp["source_date"], errors="coerce").dt.strftime("%Y-%m-%d").mode()
+                    sd = _norm_date_series(dfp["source_date"].dropna()).mode()
                     if not sd.empty and isinstance(sd.iloc[0], str) and len(sd.iloc[0]) == 10:
                         return sd.iloc[0]
             except Exception:
@@ -129,33 +199,76 @@ def _guess_latest_trading_date(asof: str) -> str:
 # =========================
 # Fetch broker summary (robust)
 # =========================
-def _fetch_broker_summary_robust(symbol: str, date_iso: str) -> pd.DataFrame:
+# aiohttp (opsional): satu event loop, ratusan request in-flight.
+# Tanpa aiohttp, fetch jatuh ke jalur ThreadPoolExecutor lama.
+try:
+    import goapi_async as _goapi_async
+except Exception:
+    _goapi_async = None
+
+# Resolusi kolom per bentuk payload di-memo sekali: skema GoAPI sama untuk
+# semua simbol, jadi dict lowercase->asli + 9 lookup kunci tak diulang per call
+_SCHEMA_CACHE: dict = {}
+
+def _resolve_keys(keys: tuple, broker_cands, side_cands, val_cands):
+    sch = _SCHEMA_CACHE.get(keys)
+    if sch is None:
+        low = {str(k).lower(): k for k in keys}
+        sch = (
+            next((low[k] for k in broker_cands if k in low), None),
+            next((low[k] for k in side_cands if k in low), None) if side_cands else None,
+            next((low[k] for k in val_cands if k in low), None),
+        )
+        _SCHEMA_CACHE[keys] = sch
+    return sch
+
+def _broker_summary_df(symbol: str, date_iso: str, js) -> pd.DataFrame:
     """
-    Return: rows (date, symbol, broker, net_value)
+    Parse payload broker summary -> rows (date, symbol, broker, net_value).
     Tahan format:
       A) flat [{broker_code, side(BUY/SELL), value}, ...]
       B) split { buy: [...], sell: [...] }
     """
-    try:
-        js = http_get(f"/stock/idx/{symbol}/broker_summary", {"date": date_iso})
-    except Exception as e:
-        log(f"[warn] {symbol}: {e}")
-        return pd.DataFrame(columns=["date", "symbol", "broker", "net_value"])
-
     rows = _first_list(js) or []
-    # Case A
+    # Case A — ambil field langsung dari dict mentah; json_normalize (yang
+    # membangun DataFrame kecil per simbol) hanya untuk payload bersarang
     if isinstance(rows, list) and rows and isinstance(rows[0], dict):
-        df = pd.json_normalize(rows, sep="_")
-        cols = {str(c).lower(): c for c in df.columns}
-        c_broker = next((cols[k] for k in ("broker_code","code","broker","brokercode") if k in cols), None)
-        c_side   = next((cols[k] for k in ("side","action","type") if k in cols), None)
-        c_val    = next((cols[k] for k in ("value","val","amount","qty_value","net","net_value") if k in cols), None)
-        if c_broker and c_side and c_val:
-            v = pd.to_numeric(df[c_val], errors="coerce")
-            side = df[c_side].astype(str).str.upper()
-            net = np.where(side.eq("BUY"), v, -v)
-            out = pd.DataFrame({"date": date_iso, "symbol": symbol, "broker": df[c_broker].astype(str), "net_value": net})
-            return out.dropna(subset=["net_value"], how="all")
+        c_broker, c_side, c_val = _resolve_keys(
+            tuple(rows[0].keys()),
+            ("broker_code","code","broker","brokercode"),
+            ("side","action","type"),
+            ("value","val","amount","qty_value","net","net_value"),
+        )
+        # jalur langsung hanya untuk nilai skalar; dict/list berarti payload
+        # bersarang -> perlu flatten json_normalize
+        flat = all(
+            k is not None and not isinstance(rows[0].get(k), (dict, list))
+            for k in (c_broker, c_side, c_val)
+        )
+        if not flat:
+            df = pd.json_normalize(rows, sep="_")
+            cols = {str(c).lower(): c for c in df.columns}
+            c_broker = next((cols[k] for k in ("broker_code","code","broker","brokercode") if k in cols), None)
+            c_side   = next((cols[k] for k in ("side","action","type") if k in cols), None)
+            c_val    = next((cols[k] for k in ("value","val","amount","qty_value","net","net_value") if k in cols), None)
+            if c_broker and c_side and c_val:
+                v = pd.to_numeric(df[c_val], errors="coerce")
+                side = df[c_side].astype(str).str.upper()
+                net = np.where(side.eq("BUY"), v, -v)
+                out = pd.DataFrame({"date": date_iso, "symbol": symbol, "broker": df[c_broker].astype(str), "net_value": net})
+                mask = out["net_value"].notna().to_numpy()
+                return out if mask.all() else out[mask]
+        else:
+            v = pd.to_numeric(pd.Series([r.get(c_val) for r in rows]), errors="coerce")
+            side_up = np.array([str(r.get(c_side)).upper() for r in rows])
+            net = np.where(side_up == "BUY", v, -v)
+            out = pd.DataFrame({
+                "date": date_iso, "symbol": symbol,
+                "broker": [str(r.get(c_broker)) for r in rows],
+                "net_value": net,
+            })
+            mask = out["net_value"].notna().to_numpy()
+            return out if mask.all() else out[mask]
 
     # Case B
     buy_list, sell_list = None, None
@@ -168,7 +281,19 @@ def _fetch_broker_summary_robust(symbol: str, date_iso: str) -> pd.DataFrame:
 
     def _lst_to_df(lst, sign):
         if not lst: return pd.DataFrame(columns=["date","symbol","broker","net_value"])
-        d = pd.json_normalize(lst, sep="_")
+        c_b, _, c_v = _resolve_keys(
+            tuple(lst[0].keys()),
+            ("broker_code","code","broker","brokercode"),
+            None,
+            ("value","val","amount","qty_value","net","net_value"),
+        )
+        if c_b and c_v:
+            return pd.DataFrame({
+                "date": date_iso, "symbol": symbol,
+                "broker": [str(r.get(c_b)) for r in lst],
+                "net_value": sign * pd.to_numeric(pd.Series([r.get(c_v) for r in lst]), errors="coerce")
+            })
+        d = pd.json_normalize(lst, sep="_")  # fallback: key bersarang
         cols = {str(c).lower(): c for c in d.columns}
         c_b = next((cols[k] for k in ("broker_code","code","broker","brokercode") if k in cols), None)
         c_v = next((cols[k] for k in ("value","val","amount","qty_value","net","net_value") if k in cols), None)
@@ -183,14 +308,27 @@ def _fetch_broker_summary_robust(symbol: str, date_iso: str) -> pd.DataFrame:
     df_buy  = _lst_to_df(buy_list,  +1)
     df_sell = _lst_to_df(sell_list, -1)
     out = pd.concat([df_buy, df_sell], ignore_index=True)
-    return out.dropna(subset=["net_value"], how="all")
+    mask = out["net_value"].notna().to_numpy()
+    return out if mask.all() else out[mask]
+
+def _fetch_broker_summary_robust(symbol: str, date_iso: str) -> pd.DataFrame:
+    try:
+        js = http_get(f"/stock/idx/{symbol}/broker_summary", {"date": date_iso})
+    except Exception as e:
+        log(f"[warn] {symbol}: {e}")
+        return pd.DataFrame(columns=["date", "symbol", "broker", "net_value"])
+    return _broker_summary_df(symbol, date_iso, js)
 
 # =========================
 # Aggregator
 # =========================
-def _retail_flag(_broker_code: str) -> int:
-    # Placeholder: jika punya daftar broker ritel, ubah di sini
-    return 0
+# Placeholder: jika punya daftar kode broker ritel, isi di sini.
+# Lookup-nya vektor (isin di atas kategori), bukan fungsi Python per baris.
+_RETAIL_SET: frozenset = frozenset()
+
+# Batch multi-tanggal dipecah per tanggal ke ProcessPoolExecutor; di bawah
+# ambang ini overhead spawn+pickle lebih mahal daripada agregasinya sendiri
+_PARALLEL_MIN_ROWS = 50_000
 
 def aggregate_broker(raw: pd.DataFrame) -> pd.DataFrame:
     if raw.empty:
@@ -200,61 +338,81 @@ def aggregate_broker(raw: pd.DataFrame) -> pd.DataFrame:
             "num_buyers","num_sellers","num_brokers","retail_broker_ratio"
         ])
 
-    df = raw.copy()
-    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    df = raw.copy(deep=False)  # kolom di-assign ulang; buffer asal tak disentuh
+    df["date"] = _norm_date_series(df["date"])
     df["symbol"] = df["symbol"].astype(str).str.upper()
     df["broker"] = df["broker"].astype(str)
     df["net_value"] = pd.to_numeric(df["net_value"], errors="coerce")
 
-    # satukan duplikat broker per (date,symbol,broker)
-    df = (df.groupby(["date","symbol","broker"], as_index=False, sort=False)["net_value"]
-            .sum(min_count=1).fillna({"net_value":0}))
+    # kunci groupby/merge sebagai kategori: hashing pakai kode int, bukan
+    # string penuh (observed=True agar kategori tak-terpakai tidak muncul)
+    for c in ("date","symbol","broker"):
+        df[c] = df[c].astype("category")
+
+    # batch rerun multi-tanggal terpartisi bersih per tanggal -> proses
+    # paralel (proses, bukan thread: hashing groupby pandas memegang GIL)
+    if len(df) >= _PARALLEL_MIN_ROWS and df["date"].nunique() > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        parts = [g for _, g in df.groupby("date", sort=False, observed=True)]
+        with ProcessPoolExecutor(max_workers=min(len(parts), os.cpu_count() or 2)) as ex:
+            outs = list(ex.map(_aggregate_normalized, parts))
+        out = pd.concat(outs, ignore_index=True)
+        return out.sort_values(["date","symbol"], kind="stable").reset_index(drop=True)
 
-    total_net = df.groupby(["date","symbol"], as_index=False, sort=False)["net_value"].sum(min_count=1)
-    total_net.rename(columns={"net_value":"total_net_value"}, inplace=True)
+    return _aggregate_normalized(df)
 
-    num_buyers = (df.assign(is_buy=df["net_value"]>0)
-                    .groupby(["date","symbol"])["is_buy"].sum().reset_index()
-                    .rename(columns={"is_buy":"num_buyers"}))
-    num_sellers = (df.assign(is_sell=df["net_value"]<0)
-                    .groupby(["date","symbol"])["is_sell"].sum().reset_index()
-                    .rename(columns={"is_sell":"num_sellers"}))
-    num_brokers = df.groupby(["date","symbol"], as_index=False)["broker"].nunique()
-    num_brokers.rename(columns={"broker":"num_brokers"}, inplace=True)
+def _aggregate_normalized(df: pd.DataFrame) -> pd.DataFrame:
+    # satukan duplikat broker per (date,symbol,broker)
+    df = (df.groupby(["date","symbol","broker"], as_index=False, sort=False, observed=True)["net_value"]
+            .sum(min_count=1).fillna({"net_value":0}))
 
-    buyers_only = df[df["net_value"]>0].copy()
+    # Semua agregat per (date,symbol) dihitung SATU pass groupby: kolom bantu
+    # dulu, lalu named-agg — bukan 6x hash ulang key + 5x merge balik.
+    df["is_buy"] = df["net_value"] > 0
+    df["is_sell"] = df["net_value"] < 0
+    df["pos_val"] = df["net_value"].clip(lower=0)
+    # isin pada kolom kategori hanya mengecek daftar kategori, bukan tiap baris
+    df["is_retail_broker"] = df["broker"].isin(_RETAIL_SET).astype(np.int8)
+
+    g = (df.groupby(["date","symbol"], sort=False, observed=True)
+           .agg(total_net_value=("net_value", "sum"),
+                num_buyers=("is_buy", "sum"),
+                num_sellers=("is_sell", "sum"),
+                num_brokers=("broker", "nunique"),
+                sum_positive=("pos_val", "sum"),
+                retail_broker_ratio=("is_retail_broker", "mean"))
+           .reset_index())
+
+    # top buyer: df sudah dedup per (date,symbol,broker), jadi tinggal argmax
+    buyers_only = df[df["is_buy"]]
     if buyers_only.empty:
         top = pd.DataFrame(columns=["date","symbol","top_buyer","top_buyer_net_value","top_buyer_concentration"])
+        out = g.merge(top, on=["date","symbol"], how="left")
     else:
-        buyers_sum = (buyers_only.groupby(["date","symbol","broker"], as_index=False, sort=False)["net_value"]
-                        .sum(min_count=1))
-        idx = buyers_sum.groupby(["date","symbol"])["net_value"].idxmax()
-        top_rows = buyers_sum.loc[idx].copy()
-        top_rows.rename(columns={"broker":"top_buyer","net_value":"top_buyer_net_value"}, inplace=True)
-        pos_sum = buyers_sum.groupby(["date","symbol"], as_index=False, sort=False)["net_value"].sum(min_count=1)
-        pos_sum.rename(columns={"net_value":"sum_positive"}, inplace=True)
-        top = top_rows.merge(pos_sum, on=["date","symbol"], how="left")
-        top["top_buyer_concentration"] = np.where(
-            top["sum_positive"]>0, top["top_buyer_net_value"]/top["sum_positive"], np.nan
+        # argmax via sort+dedup (satu pass) ketimbang groupby().idxmax()+loc;
+        # sort stabil -> saat seri, baris pertama menang (sama dengan idxmax)
+        top = (buyers_only[["date","symbol","broker","net_value"]]
+                 .sort_values("net_value", ascending=False, kind="stable")
+                 .drop_duplicates(["date","symbol"], keep="first")
+                 .rename(columns={"broker":"top_buyer","net_value":"top_buyer_net_value"}))
+        out = g.merge(top, on=["date","symbol"], how="left")
+        out["top_buyer_concentration"] = np.where(
+            out["sum_positive"].to_numpy() > 0,
+            out["top_buyer_net_value"].to_numpy() / out["sum_positive"].to_numpy(),
+            np.nan,
         )
-        top.drop(columns=["sum_positive"], inplace=True)
-
-    df["is_retail_broker"] = df["broker"].map(_retail_flag).fillna(0).astype(int)
-    retail_ratio = df.groupby(["date","symbol"], as_index=False, sort=False)["is_retail_broker"].mean()
-    retail_ratio.rename(columns={"is_retail_broker":"retail_broker_ratio"}, inplace=True)
+    out.drop(columns=["sum_positive"], inplace=True)
 
-    out = (total_net
-            .merge(num_buyers,  on=["date","symbol"], how="left")
-            .merge(num_sellers, on=["date","symbol"], how="left")
-            .merge(num_brokers, on=["date","symbol"], how="left")
-            .merge(top,         on=["date","symbol"], how="left")
-            .merge(retail_ratio,on=["date","symbol"], how="left"))
+    # balikkan kategori ke string sebelum keluar (CSV & pemanggil melihat str)
+    for c in ("date","symbol","top_buyer"):
+        if c in out.columns and isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(out[c].cat.categories.dtype)
 
     cols = ["date","symbol","total_net_value","top_buyer","top_buyer_concentration",
             "top_buyer_net_value","num_buyers","num_sellers","num_brokers","retail_broker_ratio"]
     for c in cols:
         if c not in out.columns: out[c] = np.nan
-    out = out[cols].copy()
+    out = out[cols]  # seleksi kolom sudah menghasilkan frame baru
     out["num_buyers"]  = out["num_buyers"].fillna(0).astype(int)
     out["num_sellers"] = out["num_sellers"].fillna(0).astype(int)
     out["num_brokers"] = out["num_brokers"].fillna(0).astype(int)
@@ -279,20 +437,43 @@ def main():
     log(f"[broker_agg] date={date_eff} | symbols={len(symbols)}")
 
     parts: list[pd.DataFrame] = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-        futs = {ex.submit(_fetch_broker_summary_robust, sym, date_eff): sym for sym in symbols}
-        done = 0
-        for fut in as_completed(futs):
-            sym = futs[fut]
+    if _goapi_async is not None:
+        params = {"date": date_eff}
+        if GOAPI_API_KEY:
+            params["api_key"] = GOAPI_API_KEY
+        results = _goapi_async.fetch_all_json(
+            [(f"{GOAPI_BASE_URL}/stock/idx/{sym}/broker_summary", params) for sym in symbols],
+            concurrency=MAX_WORKERS, timeout_sec=REQ_TIMEOUT_SEC,
+            max_retry=MAX_RETRY, backoff_min=RETRY_BACKOFF_MIN,
+            backoff_max=RETRY_BACKOFF_MAX, rate_sleep=RATE_LIMIT_SLEEP,
+            user_agent="idx-broker-agg/1.3",
+        )
+        for done, (sym, res) in enumerate(zip(symbols, results), 1):
             try:
-                df = fut.result()
+                if isinstance(res, Exception):
+                    raise res
+                df = _broker_summary_df(sym, date_eff, res)
                 if df is not None and not df.empty:
                     parts.append(df)
             except Exception as e:
                 log(f"[warn] {sym}: {e}")
-            done += 1
             if done % 100 == 0:
                 print(f"  .. {done} symbols", flush=True)
+    else:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            futs = {ex.submit(_fetch_broker_summary_robust, sym, date_eff): sym for sym in symbols}
+            done = 0
+            for fut in as_completed(futs):
+                sym = futs[fut]
+                try:
+                    df = fut.result()
+                    if df is not None and not df.empty:
+                        parts.append(df)
+                except Exception as e:
+                    log(f"[warn] {sym}: {e}")
+                done += 1
+                if done % 100 == 0:
+                    print(f"  .. {done} symbols", flush=True)
 
     if parts:
         raw_all = pd.concat(parts, ignore_index=True)
@@ -306,12 +487,20 @@ def main():
 
     # Tambah kolom penanda tanggal asli broker
     agg.rename(columns={"date": "broker_source_date"}, inplace=True)
-    agg["broker_source_date"] = pd.to_datetime(agg["broker_source_date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    agg["broker_source_date"] = _norm_date_series(agg["broker_source_date"])
 
     # Output: filename pakai TANGGAL YANG DIMINTA; isi punya broker_source_date
     out_path = os.path.join(DATA_DIR, f"broker_agg_{date_req}.csv")
     agg.to_csv(out_path, index=False)
     log(f"[broker_agg] wrote {len(agg)} rows -> {out_path}")
 
+    # Sibling Parquet (konvensi pipelines/migrate_to_parquet.py): pembaca
+    # memilihnya bila tidak lebih tua dari CSV. CSV tetap format kanonik.
+    if pa is not None:
+        try:
+            agg.to_parquet(os.path.splitext(out_path)[0] + ".parquet", engine="pyarrow", index=False)
+        except Exception as e:
+            log(f"[broker_agg] WARNING: gagal tulis Parquet sibling: {e}")
+
 if __name__ == "__main__":
     main()
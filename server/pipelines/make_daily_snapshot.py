@@ -1,44 +1,191 @@
 import os, sys, glob
+import hashlib
 import numpy as np
 import pandas as pd
+from bisect import bisect_right
 from datetime import datetime, timedelta
 
+# PyArrow (opsional): parser CSV multi-thread + baca sibling Parquet dari
+# pipeline ingest; tanpa pyarrow jatuh ke pd.read_csv seperti semula
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except Exception:
+    pa = pacsv = None
+
 DATA_DIR = os.environ.get("DATA_DIR", "data").rstrip("/")
 
+# ==== Numba (opsional): kernel fitur fused satu pass, prange per simbol ====
+# Menghitung lag1/ret_1/rolling-mean/vol_ratio + 6 kolom lag dalam satu
+# lintasan per grup, tanpa temporari cumsum. Tanpa numba jatuh ke kernel
+# numpy _group_shift/_group_roll_mean di bawah (hasil numerik sama).
+try:
+    from numba import njit, prange
+
+    # error_model="numpy": 0/0 dan x/0 menghasilkan NaN/inf seperti numpy,
+    # bukan ZeroDivisionError — jangan bergantung pada lowering parfors
+    # yang kebetulan menekan error model default ("python")
+    @njit(parallel=True, cache=True, error_model="numpy")
+    def _features_jit(close, volume, bounds):  # pragma: no cover - dikompilasi numba
+        n = close.size
+        close_lag1 = np.empty(n, dtype=np.float64)
+        ret_1 = np.empty(n, dtype=np.float64)
+        vol_lag20 = np.empty(n, dtype=np.float64)
+        vol_ratio = np.empty(n, dtype=np.float64)
+        lags = np.empty((6, n), dtype=np.float64)
+        for g in prange(bounds.size - 1):
+            s = bounds[g]
+            e = bounds[g + 1]
+            run_sum = 0.0
+            run_cnt = 0
+            for i in range(s, e):
+                # lag1 harga + return 1 hari
+                cl = close[i - 1] if i > s else np.nan
+                close_lag1[i] = cl
+                r = close[i] / cl - 1.0
+                ret_1[i] = r if np.isfinite(r) else np.nan
+                # rolling mean(20, min_periods=1) volume: running sum +
+                # subtract-out nilai yang keluar jendela (skip NaN)
+                v = volume[i]
+                if not np.isnan(v):
+                    run_sum += v
+                    run_cnt += 1
+                j = i - 20
+                if j >= s:
+                    w = volume[j]
+                    if not np.isnan(w):
+                        run_sum -= w
+                        run_cnt -= 1
+                m = run_sum / run_cnt if run_cnt > 0 else np.nan
+                vol_lag20[i] = m
+                vr = v / m
+                vol_ratio[i] = vr if np.isfinite(vr) else np.nan
+            for k in range(1, 4):
+                for i in range(s, e):
+                    lags[k - 1, i] = ret_1[i - k] if i - k >= s else np.nan
+                    lags[k + 2, i] = vol_ratio[i - k] if i - k >= s else np.nan
+        return close_lag1, ret_1, vol_lag20, vol_ratio, lags
+
+    # warm-up saat import: biaya kompilasi JIT dibayar sekali di startup
+    _features_jit(np.zeros(2), np.zeros(2), np.array([0, 2], dtype=np.int64))
+except Exception:
+    _features_jit = None
+
 def load_prices_for(date_str: str) -> pd.DataFrame:
     path = os.path.join(DATA_DIR, f"prices_{date_str}.csv")
     if not os.path.exists(path):
         raise FileNotFoundError(path)
+    if pa is not None:
+        # sibling Parquet (konvensi migrate_to_parquet.py): pakai bila tidak
+        # lebih tua dari CSV-nya
+        pq = os.path.splitext(path)[0] + ".parquet"
+        if os.path.exists(pq) and os.path.getmtime(pq) >= os.path.getmtime(path):
+            try:
+                return pd.read_parquet(pq)
+            except Exception:
+                pass
+        try:
+            return pacsv.read_csv(path).to_pandas()
+        except Exception:
+            pass  # CSV aneh: jatuh ke parser pandas
     return pd.read_csv(path)
 
+# Indeks file per prefix: satu os.scandir yang di-memo dan diinvalidasi via
+# mtime DATA_DIR; tanggal di nama file diparse strptime (jauh lebih murah
+# dari pd.to_datetime per file) lalu lookup "<= target" jadi bisect O(log N).
+_FILE_INDEX: dict = {}
+
+def _file_index(prefix: str):
+    try:
+        dir_mtime = os.stat(DATA_DIR).st_mtime_ns
+    except OSError:
+        return [], []
+    cached = _FILE_INDEX.get(prefix)
+    if cached and cached[0] == dir_mtime:
+        return cached[1], cached[2]
+    n = len(prefix)
+    pairs = []
+    with os.scandir(DATA_DIR) as it:
+        for e in it:
+            name = e.name
+            if name.startswith(prefix) and name.endswith(".csv"):
+                try:
+                    d = datetime.strptime(name[n:n + 10], "%Y-%m-%d").date()
+                except ValueError:
+                    continue  # nama tak berpola tanggal: lewati
+                pairs.append((d, e.path))
+    pairs.sort()
+    dates = [d for d, _ in pairs]
+    paths = [q for _, q in pairs]
+    _FILE_INDEX[prefix] = (dir_mtime, dates, paths)
+    return dates, paths
+
+def _parse_target_date(date_str: str):
+    try:
+        return datetime.strptime(date_str[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return pd.to_datetime(date_str).date()
+
+def _join_agg(left: pd.DataFrame, agg: pd.DataFrame) -> pd.DataFrame:
+    """Left-join broker_agg lewat index simbol: satu gather get_indexer di
+    index unik, bukan hash-join merge yang membangun tabel baru tiap call.
+    Kolom kanan yang bentrok diberi akhiran _agg (sama dengan merge lama)."""
+    return left.join(agg.set_index("symbol"), on="symbol", how="left", rsuffix="_agg")
+
 def find_agg_on_or_before(date_str: str):
-    files = sorted(glob.glob(os.path.join(DATA_DIR, "broker_agg_*.csv")))
-    if not files:
+    dates, paths = _file_index("broker_agg_")
+    if not dates:
         return None, None
-    tgt = pd.to_datetime(date_str).date()
-    cand = []
-    for p in files:
-        d = pd.to_datetime(os.path.basename(p)[11:-4]).date()  # tanggal di NAMA FILE (requested)
-        if d <= tgt:
-            cand.append((d, p))
-    if not cand:
+    i = bisect_right(dates, _parse_target_date(date_str)) - 1
+    if i < 0:
         return None, None
-    cand.sort()
-    p = cand[-1][1]
-    eff = os.path.basename(p)[11:-4]
-    return p, eff
-
-def add_lags(df: pd.DataFrame, cols, lags=(1,2,3)):
-    df = df.sort_values(["symbol","date"]).copy()
-    for c in cols:
-        if c in df.columns:
-            for k in lags:
-                df[f"{c}_lag{k}"] = df.groupby("symbol", sort=False)[c].shift(k)
-    return df
+    return paths[i], dates[i].isoformat()  # tanggal di NAMA FILE (requested)
+
+def _group_roll_mean(arr: np.ndarray, codes: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean(window, min_periods=1) per grup di atas array tersortir
+    per simbol: beda cumsum nilai & cumsum hitungan non-NaN dengan awal
+    jendela dijepit ke awal grup. Satu pass O(N) tanpa objek Rolling."""
+    n = len(arr)
+    nan = np.isnan(arr)
+    csum = np.cumsum(np.where(nan, 0.0, arr))
+    ccnt = np.cumsum(~nan)
+    first = np.zeros(n, dtype=np.int64)
+    starts = np.flatnonzero(np.diff(codes)) + 1
+    first[starts] = starts
+    first = np.maximum.accumulate(first)  # indeks awal grup untuk tiap baris
+    w0 = np.maximum(np.arange(n) - (window - 1), first)
+    sum_win = csum - np.where(w0 > 0, csum[w0 - 1], 0.0)
+    n_win = ccnt - np.where(w0 > 0, ccnt[w0 - 1], 0)
+    return np.divide(sum_win, n_win, out=np.full(n, np.nan), where=n_win > 0)
+
+def _group_shift(arr: np.ndarray, codes: np.ndarray, k: int) -> np.ndarray:
+    """Shift(k) per grup di atas array yang sudah tersortir per simbol:
+    geser numpy biasa lalu NaN-kan baris yang "meminjam" dari simbol lain.
+    Satu pass O(N) tanpa hashing/dispatch groupby."""
+    out = np.empty(len(arr), dtype=np.float64)
+    out[:k] = np.nan
+    out[k:] = arr[:-k] if k else arr
+    out[k:][codes[k:] != codes[:-k]] = np.nan
+    return out
 
 def compute_features(prices: pd.DataFrame) -> pd.DataFrame:
-    prices = prices.copy()
-    prices["symbol"] = prices["symbol"].astype(str).str.upper()
+    """Hitung fitur per simbol. CATATAN: frame input DIKONSUMSI (dimutasi
+    in-place sebelum sort) — pemanggil memberi hasil pd.concat segar yang
+    tak direferensikan pihak lain, jadi copy defensif di sini hanya
+    menggandakan alokasi frame 90 hari tanpa guna."""
+    # kategori: upper-case per kategori unik (bukan per baris), dan groupby/
+    # sort selanjutnya bekerja di kode int. Kategori diurut ulang leksikal
+    # agar sort_values sama persis dengan kolom string.
+    sym = prices["symbol"].astype("category")
+    cats = sym.cat.categories.astype(str).str.upper()
+    if cats.is_unique:
+        sym = sym.cat.rename_categories(cats)
+        if not cats.is_monotonic_increasing:
+            sym = sym.cat.reorder_categories(cats.sort_values(), ordered=False)
+        prices["symbol"] = sym
+    else:
+        # huruf besar menyatukan kategori (mis. 'bbca' & 'BBCA'): jalur lama
+        prices["symbol"] = prices["symbol"].astype(str).str.upper().astype("category")
 
     # date = "asof" dari file; source_date = tanggal bar asli (kalau ada)
     if "date" not in prices.columns:
@@ -52,34 +199,49 @@ def compute_features(prices: pd.DataFrame) -> pd.DataFrame:
             prices[c] = np.nan
 
     prices = prices.sort_values(["symbol","date"])
-    prices["close_lag1"] = prices.groupby("symbol", sort=False)["close"].shift(1)
-    prices["ret_1"] = (prices["close"] / prices["close_lag1"] - 1.0).replace([np.inf,-np.inf], np.nan)
-
-    prices["vol_lag20"] = (
-        prices.groupby("symbol", sort=False)["volume"]
-              .rolling(20, min_periods=1)
-              .mean().reset_index(level=0, drop=True)
-    )
-    prices["vol_ratio"] = (prices["volume"] / prices["vol_lag20"]).replace([np.inf,-np.inf], np.nan)
-
-    prices = add_lags(prices, ["ret_1","vol_ratio"], lags=(1,2,3))
-    prices["is_price_lt_500"] = (prices["close"] < 500).astype(int)
+    # kode kategori = kode grup; tak perlu faktorisasi ulang
+    codes = prices["symbol"].cat.codes.to_numpy()
+    close = prices["close"].to_numpy(dtype=np.float64)
+    volume = prices["volume"].to_numpy(dtype=np.float64)
+
+    if _features_jit is not None and codes.size:
+        # batas grup untuk prange: indeks awal tiap simbol + sentinel akhir
+        bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        bounds = np.append(bounds, codes.size)
+        close_lag1, ret_1, vol_lag20, vol_ratio, lags = _features_jit(close, volume, bounds)
+        r1_lags = {k: lags[k - 1] for k in (1, 2, 3)}
+        vr_lags = {k: lags[k + 2] for k in (1, 2, 3)}
+    else:
+        close_lag1 = _group_shift(close, codes, 1)
+        vol_lag20 = _group_roll_mean(volume, codes, 20)
+        # bagi + buang inf dalam satu scan ndarray (bukan Series-div lalu
+        # .replace yang memindai intermediate penuh dua kali)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ret_1 = close / close_lag1 - 1.0
+            vol_ratio = volume / vol_lag20
+        ret_1[~np.isfinite(ret_1)] = np.nan
+        vol_ratio[~np.isfinite(vol_ratio)] = np.nan
+        r1_lags = {k: _group_shift(ret_1, codes, k) for k in (1, 2, 3)}
+        vr_lags = {k: _group_shift(vol_ratio, codes, k) for k in (1, 2, 3)}
+
+    prices["close_lag1"] = close_lag1
+    prices["ret_1"] = ret_1
+    prices["vol_lag20"] = vol_lag20
+    prices["vol_ratio"] = vol_ratio
+    for k in (1, 2, 3):
+        prices[f"ret_1_lag{k}"] = r1_lags[k]
+        prices[f"vol_ratio_lag{k}"] = vr_lags[k]
+    # view uint8 di atas hasil compare (zero-copy, 1 byte/baris; NaN < 500
+    # = False -> 0, sama dengan astype(int) lama yang 8 byte/baris)
+    prices["is_price_lt_500"] = np.less(close, 500).view(np.uint8)
     return prices
 
 def find_latest_snapshot_on_or_before(target_date: str) -> str | None:
-    snaps = sorted(glob.glob(os.path.join(DATA_DIR, "daily_snapshot_*.csv")))
-    if not snaps:
+    dates, paths = _file_index("daily_snapshot_")
+    if not dates:
         return None
-    tgt = pd.to_datetime(target_date).date()
-    cand = []
-    for p in snaps:
-        d = pd.to_datetime(os.path.basename(p)[15:-4]).date()
-        if d <= tgt:
-            cand.append((d, p))
-    if not cand:
-        return None
-    cand.sort()
-    return cand[-1][1]
+    i = bisect_right(dates, _parse_target_date(target_date)) - 1
+    return paths[i] if i >= 0 else None
 
 def fallback_clone_from_latest_snapshot(target_date: str) -> int:
     src = find_latest_snapshot_on_or_before(target_date)
@@ -99,11 +261,12 @@ def fallback_clone_from_latest_snapshot(target_date: str) -> int:
             agg.rename(columns={"date":"broker_source_date"}, inplace=True)
         if "symbol" in agg.columns:
             agg["symbol"] = agg["symbol"].astype(str).str.upper()
-            df = df.merge(agg, on="symbol", how="left", suffixes=("","_agg"))
+            df = _join_agg(df, agg)
 
     df = _finalize_snapshot_columns(df, target_date)
     out_path = os.path.join(DATA_DIR, f"daily_snapshot_{target_date}.csv")
-    df.to_csv(out_path, index=False)
+    _write_snapshot_csv(df, out_path)
+    _write_parquet_sibling(df, out_path, "fallback")
     print(f"[fallback] wrote {len(df):,} rows -> {out_path}")
     return len(df)
 
@@ -119,16 +282,49 @@ def _finalize_snapshot_columns(df: pd.DataFrame, asof_str: str) -> pd.DataFrame:
         # penanda staleness:
         "price_source_date","broker_source_date","age_price_days","age_broker_days","is_market_closed",
     ]
-    for c in keep:
-        if c not in df.columns:
-            df[c] = np.nan
-    # jaga format tanggal sebagai YYYY-MM-DD string
+    # satu reindex: kolom hilang jadi NaN + urutan final, tanpa loop
+    # assignment per kolom (yang konsolidasi block manager tiap kali)
+    df = df.reindex(columns=keep)
+    # jaga format tanggal sebagai YYYY-MM-DD string; formatter C numpy
+    # (datetime64[D] -> str) alih-alih .dt.strftime yang strftime per elemen
     for c in ("date","price_source_date","broker_source_date"):
-        if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors="coerce").dt.strftime("%Y-%m-%d")
+        s = pd.to_datetime(df[c], errors="coerce")
+        vals = s.to_numpy().astype("datetime64[D]").astype(str).astype(object)
+        vals[s.isna().to_numpy()] = np.nan  # NaT: "NaT" -> NaN spt strftime
+        df[c] = vals
     # pastikan date final = asof_str
     df["date"] = asof_str
-    return df[keep].copy()
+    # flag 0/1 cukup int8 — teks CSV tak berubah, buffer & Parquet mengecil
+    for c in ("is_price_lt_500", "is_market_closed"):
+        if pd.api.types.is_integer_dtype(df[c]):
+            df[c] = df[c].astype(np.int8)
+    return df
+
+def _write_snapshot_csv(df: pd.DataFrame, csv_path: str) -> None:
+    """Tulis CSV snapshot lewat writer C++ pyarrow (satu batch, formatter
+    float SIMD, lepas GIL) alih-alih to_csv yang str() per sel. Format
+    angka tetap round-trip; string dan non-float lain di-quote oleh Arrow
+    ("needed") — pembaca CSV manapun mem-parse nilai yang sama."""
+    if pa is not None:
+        try:
+            pacsv.write_csv(
+                pa.Table.from_pandas(df, preserve_index=False), csv_path,
+                write_options=pacsv.WriteOptions(include_header=True, quoting_style="needed"),
+            )
+            return
+        except Exception:
+            pass  # kolom yang tak bisa dikonversi Arrow: jatuh ke pandas
+    df.to_csv(csv_path, index=False)
+
+def _write_parquet_sibling(df: pd.DataFrame, csv_path: str, tag: str) -> None:
+    # Sibling Parquet (konvensi pipelines/migrate_to_parquet.py): pembaca
+    # server memilihnya bila tidak lebih tua dari CSV. CSV tetap kanonik.
+    if pa is None:
+        return
+    try:
+        df.to_parquet(os.path.splitext(csv_path)[0] + ".parquet", engine="pyarrow", index=False)
+    except Exception as e:
+        print(f"[{tag}] WARNING: gagal tulis Parquet sibling: {e}")
 
 def build_snapshot_for(date_str: str):
     out_path = os.path.join(DATA_DIR, f"daily_snapshot_{date_str}.csv")
@@ -137,25 +333,86 @@ def build_snapshot_for(date_str: str):
     end = datetime.strptime(date_str, "%Y-%m-%d")
     start = end - timedelta(days=90)
 
-    frames = []
-    for d in pd.date_range(start, end, freq="D"):
-        dstr = d.strftime("%Y-%m-%d")
+    # kumpulkan dulu hari yang filenya ada, lalu parse paralel: reader
+    # pyarrow/parquet melepas GIL sehingga 8 thread ~linear untuk fase parse
+    dates = [d.strftime("%Y-%m-%d") for d in pd.date_range(start, end, freq="D")]
+    avail = [ds for ds in dates if os.path.exists(os.path.join(DATA_DIR, f"prices_{ds}.csv"))]
+
+    def _load_or_none(ds: str):
         try:
-            frames.append(load_prices_for(dstr))
-        except FileNotFoundError:
-            continue
+            return load_prices_for(ds)
+        except FileNotFoundError:  # file hilang di antara cek & baca
+            return None
+
+    # Cache feats di disk: concat+compute_features 90 hari hampir selalu
+    # identik dengan run kemarin. Kunci = path input + mtime_ns (CSV dan
+    # sibling Parquet-nya, karena load_prices_for bisa membaca keduanya);
+    # input berubah -> kunci berubah -> hitung ulang penuh.
+    feats = None
+    cache_path = None
+    if pa is not None and avail:
+        h = hashlib.blake2b(digest_size=8)
+        for ds in avail:
+            p = os.path.join(DATA_DIR, f"prices_{ds}.csv")
+            for q in (p, os.path.splitext(p)[0] + ".parquet"):
+                try:
+                    h.update(f"{q}:{os.stat(q).st_mtime_ns}|".encode())
+                except OSError:
+                    pass
+        cache_dir = os.path.join(DATA_DIR, ".cache")
+        cache_path = os.path.join(cache_dir, f"feats_{h.hexdigest()}.parquet")
+        if os.path.exists(cache_path):
+            try:
+                feats = pd.read_parquet(cache_path)
+                print(f"[make_snapshot] feats cache hit: {os.path.basename(cache_path)}")
+            except Exception:
+                feats = None  # cache korup: hitung ulang
+
+    frames = []
+    if feats is None:
+        if len(avail) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(len(avail), 8)) as ex:
+                frames = [f for f in ex.map(_load_or_none, avail) if f is not None]
+        elif avail:
+            frames = [f for f in (_load_or_none(avail[0]),) if f is not None]
 
     if frames:
         prices_all = pd.concat(frames, ignore_index=True)
         feats = compute_features(prices_all)
-        asof = pd.to_datetime(date_str).normalize()
+        if cache_path is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # tulis atomik (konvensi cache goapi) lalu buang kunci lama
+                # agar cache tidak tumbuh tanpa batas
+                tmp = cache_path + ".tmp"
+                feats.to_parquet(tmp, engine="pyarrow", index=False)
+                os.replace(tmp, cache_path)
+                for old in glob.glob(os.path.join(cache_dir, "feats_*.parquet")):
+                    if old != cache_path:
+                        os.remove(old)
+            except Exception as e:
+                print(f"[make_snapshot] WARNING: gagal tulis cache feats: {e}")
+
+    if feats is not None:
+        # date_str sudah tervalidasi %Y-%m-%d oleh strptime di atas; tak
+        # perlu lewat parser umum pd.to_datetime untuk satu skalar
+        asof = pd.Timestamp(end)
 
-        # PILIH bar terakhir <= ASOF per simbol berdasarkan "date" (file harian)
-        sub = (feats[feats["date"] <= asof]
-               .sort_values(["symbol","date"])
-               .groupby("symbol", as_index=False)
-               .tail(1)
-               ).copy()
+        # PILIH bar terakhir <= ASOF per simbol berdasarkan "date" (file harian).
+        # feats sudah tersortir (symbol, date) dari compute_features dan mask
+        # mempertahankan urutan, jadi baris terakhir tiap simbol = baris yang
+        # kode simbol berikutnya berbeda — tanpa sort ulang + groupby.tail.
+        # banding view int64 nanodetik, tanpa dispatch __le__ Timestamp per
+        # blok; NaT (INT64_MIN) lolos "<=" sehingga harus disaring eksplisit
+        # agar sama dengan perbandingan lama (NaT <= asof -> False)
+        dv = feats["date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        feats_le = feats[(dv <= asof.value) & (dv != np.iinfo(np.int64).min)]
+        c = feats_le["symbol"].cat.codes.to_numpy()
+        if len(c):
+            sub = feats_le[np.r_[c[1:] != c[:-1], True]].copy()
+        else:
+            sub = feats_le.copy()
 
         # Bawa source_date untuk staleness harga
         if "source_date" in sub.columns:
@@ -172,21 +429,28 @@ def build_snapshot_for(date_str: str):
                 agg.rename(columns={"date":"broker_source_date"}, inplace=True)
             if "symbol" in agg.columns:
                 agg["symbol"] = agg["symbol"].astype(str).str.upper()
-                sub = sub.merge(agg, on="symbol", how="left", suffixes=("","_agg"))
+                sub = _join_agg(sub, agg)
 
-        # Hitung usia data & flag market closed
-        sub["asof"] = asof
-        for c in ("price_source_date","broker_source_date","asof"):
+        # Hitung usia data & flag market closed: kedua kolom sumber distack
+        # jadi satu matriks datetime64[D] dan dikurangkan dari asof sekali
+        # jalan — tanpa kolom bantu "asof" dan dua pass .dt.days terpisah
+        for c in ("price_source_date","broker_source_date"):
             sub[c] = pd.to_datetime(sub[c], errors="coerce")
-        sub["age_price_days"]  = (sub["asof"] - sub["price_source_date"]).dt.days
-        sub["age_broker_days"] = (sub["asof"] - sub["broker_source_date"]).dt.days
-        sub["is_market_closed"] = (sub["age_price_days"] > 0).astype(int)
+        srcs = sub[["price_source_date","broker_source_date"]].to_numpy(dtype="datetime64[ns]")
+        nat = np.isnat(srcs)
+        ages = (np.datetime64(asof, "D").astype(np.int64)
+                - srcs.astype("datetime64[D]").view(np.int64)).astype(np.float64)
+        ages[nat] = np.nan  # NaT -> NaN seperti .dt.days dulu
+        for j, c in enumerate(("age_price_days", "age_broker_days")):
+            sub[c] = ages[:, j] if nat[:, j].any() else ages[:, j].astype(np.int32)
+        sub["is_market_closed"] = (ages[:, 0] > 0).astype(np.int8)
 
         # Set tanggal final ke string
         sub["date"] = asof
 
         df_out = _finalize_snapshot_columns(sub, asof.strftime("%Y-%m-%d"))
-        df_out.to_csv(out_path, index=False)
+        _write_snapshot_csv(df_out, out_path)
+        _write_parquet_sibling(df_out, out_path, "make_snapshot")
         print(f"[make_snapshot] wrote {len(df_out):,} rows (jalur harga)")
         return
 
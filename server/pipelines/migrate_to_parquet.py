@@ -0,0 +1,34 @@
+"""
+Usage:
+  DATA_DIR=./data python3 pipelines/migrate_to_parquet.py
+
+Migrasi one-off: tulis daily_snapshot_*.parquet / broker_agg_*.parquet /
+prices_*.parquet di samping CSV yang sudah ada. CSV tetap jadi format
+kanonik (pipeline lain masih menulis CSV); API memilih Parquet sibling
+bila ada dan tidak lebih tua dari CSV-nya.
+"""
+
+import os
+import glob
+
+import pandas as pd
+
+DATA_DIR = os.environ.get("DATA_DIR", "data").rstrip("/")
+
+PATTERNS = ["daily_snapshot_*.csv", "broker_agg_*.csv", "prices_*.csv"]
+
+def migrate() -> None:
+    written = skipped = 0
+    for pattern in PATTERNS:
+        for csv_path in sorted(glob.glob(os.path.join(DATA_DIR, pattern))):
+            pq_path = os.path.splitext(csv_path)[0] + ".parquet"
+            if os.path.exists(pq_path) and os.stat(pq_path).st_mtime_ns >= os.stat(csv_path).st_mtime_ns:
+                skipped += 1
+                continue
+            df = pd.read_csv(csv_path)
+            df.to_parquet(pq_path, engine="pyarrow", index=False)
+            written += 1
+    print(f"[migrate_parquet] wrote {written} files, skipped {skipped} (sudah up-to-date)")
+
+if __name__ == "__main__":
+    migrate()